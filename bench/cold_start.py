@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["pandas", "numpy", "pyarrow", "openai", "supabase", "httpx", "aiohttp", "streamlit.components.v1"]
+
+def child():
+    # runs in a fresh interpreter so module caches and RSS start from nothing
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    framework = time.perf_counter() - t0
+    base_modules = set(sys.modules)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    at = AppTest.from_file(os.path.join(ROOT, "game.py"), default_timeout=60)
+    t1 = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - t1
+    t2 = time.perf_counter()
+    at.run()
+    rerun = time.perf_counter() - t2
+    print(json.dumps({
+        "framework_import_s": framework,
+        "first_run_s": first_run,
+        "rerun_s": rerun,
+        "app_modules": len(set(sys.modules) - base_modules),
+        "app_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss,
+        "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "heavy_loaded": [m for m in HEAVY if m in sys.modules and m not in base_modules],
+        "errors": [str(e.value)[:200] for e in at.exception],
+    }))
+
+def measure(runs):
+    workdir = tempfile.mkdtemp(prefix="celeb-cold-")
+    env = dict(os.environ, SCORE_BACKEND="memory", RESPONSE_CACHE_PATH="",
+               CELEB_POOL_PATH=os.path.join(workdir, "celebrity_pool.db"),
+               QUESTION_BANK_PATH=os.path.join(workdir, "question_bank.json"))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=workdir, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return samples
+
+def median(samples, key):
+    return round(statistics.median(s[key] for s in samples), 4)
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+def compare(report, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        base = json.load(f)
+    failed = False
+    print(f"\ncompared with {baseline_path} ({base.get('commit')})")
+    for name in ("first_run_s", "app_modules", "app_rss_kb"):
+        old, new = base[name], report[name]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            failed = True
+        print(f"  {name:14s} {old:>10} -> {new:<10} ({change:+.1%}){flag}")
+    return not failed
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure cold start of game.py on the name-entry screen in fresh interpreters")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench", "results"))
+    ap.add_argument("--compare", help="earlier result file to check for regressions")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative increase before flagging")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child()
+        return
+
+    samples = measure(args.runs)
+    report = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "runs": args.runs,
+        "framework_import_s": median(samples, "framework_import_s"),
+        "first_run_s": median(samples, "first_run_s"),
+        "rerun_s": median(samples, "rerun_s"),
+        "app_modules": median(samples, "app_modules"),
+        "app_rss_kb": median(samples, "app_rss_kb"),
+        "rss_kb": median(samples, "rss_kb"),
+        "heavy_loaded": samples[-1]["heavy_loaded"],
+        "errors": samples[-1]["errors"],
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"cold-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"saved {path}")
+    if args.compare and not compare(report, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NAMES = [
+    "Tom Hanks", "Meryl Streep", "Denzel Washington", "Cate Blanchett", "Keanu Reeves", "Viola Davis",
+    "Aamir Khan", "Deepika Padukone", "Ranbir Kapoor", "Alia Bhatt", "Mohanlal", "Nazriya Nazim",
+]
+
+def respond(messages):
+    system = messages[0]["content"] if messages else ""
+    user = messages[-1]["content"] if messages else ""
+    if "JSON" in system:
+        if "For each of these film celebrities" in user:
+            names = json.loads(user[user.index("["): user.index("]") + 1])
+            return json.dumps({"rounds": [
+                {"name": n, "intro": "I grew up far from the studios and found my way in slowly. Fans know my voice.",
+                 "questions": ["Have you won a major award", "Did you start in theatre", "Do you sing in your films"]}
+                for n in names
+            ]})
+        if "celebrity names" in user:
+            return json.dumps(NAMES)
+        count = 20 if "exactly 20" in user else 5
+        return json.dumps([f"Generic question number {i} from the fake model" for i in range(count)])
+    if "yes or no" in system:
+        m = re.search(r"User guess: '(.*)'\. Correct name: '(.*)'\.", user)
+        return "yes" if m and m.group(1).lower() in m.group(2).lower() else "no"
+    return "That is a lovely question. I have spent many years on film sets and still enjoy every day of it."
+
+class FakeOpenAIServer:
+    def __init__(self, latency=0.2, tokens_per_sec=60.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.by_kind = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                server.handle(self, body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    def count(self, messages):
+        kind = "json" if messages and "JSON" in messages[0]["content"] else "chat"
+        with self.lock:
+            self.requests += 1
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+
+    def handle(self, req, body):
+        messages = body.get("messages", [])
+        self.count(messages)
+        text = respond(messages)
+        words = text.split(" ")
+        time.sleep(self.latency)
+        prompt_tokens = sum(len(m.get("content", "")) // 4 for m in messages)
+        if body.get("stream"):
+            req.send_response(200)
+            req.send_header("Content-Type", "text/event-stream")
+            req.send_header("Connection", "close")
+            req.end_headers()
+            for i, word in enumerate(words):
+                if self.tokens_per_sec:
+                    time.sleep(1.0 / self.tokens_per_sec)
+                chunk = {"id": "fake", "object": "chat.completion.chunk", "model": body.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": word if i == len(words) - 1 else word + " "},
+                                      "finish_reason": None}]}
+                req.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                req.wfile.flush()
+            req.wfile.write(b"data: [DONE]\n\n")
+            req.close_connection = True
+            return
+        if self.tokens_per_sec:
+            time.sleep(len(words) / self.tokens_per_sec)
+        data = json.dumps({
+            "id": "fake", "object": "chat.completion", "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                      "total_tokens": prompt_tokens + len(words)},
+        }).encode()
+        req.send_response(200)
+        req.send_header("Content-Type", "application/json")
+        req.send_header("Content-Length", str(len(data)))
+        req.end_headers()
+        req.wfile.write(data)
+
+def main():
+    ap = argparse.ArgumentParser(description="OpenAI-compatible stand-in for local runs and benchmarks")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    ap.add_argument("--tokens-per-sec", type=float, default=60.0)
+    args = ap.parse_args()
+    server = FakeOpenAIServer(args.latency, args.tokens_per_sec, port=args.port).start()
+    print(f"fake OpenAI listening on {server.url} (set OPENAI_API_BASE to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import threading
+
+from score_store import MemoryScoreStore
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+class _Call:
+    def __init__(self, client, fn):
+        self.client = client
+        self.fn = fn
+
+    def execute(self):
+        self.client.count()
+        return _Result(self.fn())
+
+class _Query:
+    def __init__(self, client):
+        self.client = client
+        self.limit_n = None
+        self.desc = False
+
+    def select(self, *args):
+        return self
+
+    def order(self, column, desc=False):
+        self.desc = desc
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def execute(self):
+        self.client.count()
+        return _Result(self.client.store.top(self.limit_n or 1000))
+
+class FakeSupabaseClient:
+    # covers the calls SupabaseScoreStore makes: the score RPCs and the top-N leaderboard select
+    def __init__(self):
+        self.store = MemoryScoreStore()
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def count(self):
+        with self.lock:
+            self.round_trips += 1
+
+    def table(self, name):
+        return _Query(self)
+
+    def rpc(self, name, params):
+        if name == "increment_score":
+            return _Call(self, lambda: self.store.increment(params["p_player"], params["p_points"]))
+        if name == "increment_scores":
+            return _Call(self, lambda: self.store.increment_many({r["player"]: r["points"] for r in params["p_rows"]}))
+        if name == "player_score":
+            return _Call(self, lambda: self.store.get(params["p_player"]))
+        raise ValueError(f"unknown rpc {name}")
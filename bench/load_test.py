@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import pickle
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import FakeOpenAIServer
+from fake_supabase import FakeSupabaseClient
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def session_bytes(at):
+    total = 0
+    for key, value in at.session_state.items():
+        try:
+            total += len(pickle.dumps(value))
+        except Exception:
+            pass
+    return total
+
+class Player:
+    def __init__(self, idx, args, supabase, results):
+        self.idx = idx
+        self.args = args
+        self.supabase = supabase
+        self.results = results
+
+    def run(self, at, label):
+        t0 = time.perf_counter()
+        at.run(timeout=self.args.timeout)
+        elapsed = time.perf_counter() - t0
+        self.results.record(label, elapsed)
+        if at.exception:
+            self.results.record_error(label, str(at.exception[0].value))
+        return elapsed
+
+    def play(self):
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(os.path.join(ROOT, "game.py"), default_timeout=self.args.timeout)
+        at.secrets["SUPABASE_URL"] = "http://fake-supabase"
+        at.secrets["SUPABASE_KEY"] = "fake"
+        self.run(at, "load")
+        at.text_input[0].input(f"bench-player-{self.idx}")
+        at.multiselect[0].select("Hollywood")
+        at.button[0].click()
+        self.run(at, "start")
+        # wait for the prefetched rounds to land the way a browser would, via autorefresh reruns
+        deadline = time.monotonic() + self.args.timeout
+        while at.session_state.prefetch and time.monotonic() < deadline:
+            time.sleep(0.05)
+            self.run(at, "prefetch")
+        celebs = at.session_state.celebrity_rounds
+        for i in range(min(self.args.rounds, len(celebs))):
+            at.button(key=f"qbtn_{i}_0").click()
+            self.run(at, "suggest")
+            for _ in range(self.args.asks):
+                at.text_area(key=f"prompt_{i}").input(f"Question {i} from player {self.idx}")
+                at.button(key=f"ask_{i}").click()
+                self.run(at, "ask")
+            at.text_input(key=f"guess_{i}").input("Definitely Not Them")
+            at.button(key=f"guess_btn_{i}").click()
+            self.guess(at)
+            at.text_input(key=f"guess_{i}").input(celebs[i])
+            at.button(key=f"guess_btn_{i}").click()
+            self.guess(at)
+        self.results.record_session_bytes(session_bytes(at))
+
+    def guess(self, at):
+        before = self.supabase.round_trips
+        self.run(at, "guess")
+        # with several players in flight this also counts their writes, so it is an upper bound per guess
+        self.results.record_db(self.supabase.round_trips - before)
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = []
+        self.db_per_guess = []
+        self.session_bytes = []
+
+    def record(self, label, seconds):
+        with self.lock:
+            self.latencies.setdefault(label, []).append(seconds)
+
+    def record_error(self, label, message):
+        with self.lock:
+            self.errors.append({"step": label, "error": message[:200]})
+
+    def record_db(self, n):
+        with self.lock:
+            self.db_per_guess.append(n)
+
+    def record_session_bytes(self, n):
+        with self.lock:
+            self.session_bytes.append(n)
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+def share_runtime():
+    # AppTest installs a mock Runtime for each run and clears it when that run ends, which would pull it out
+    # from under other sessions still in flight; keep handing out the last one instead
+    from streamlit.runtime import Runtime
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        elif last:
+            return last[0]
+        return cls._instance or Runtime._orig_instance()
+    Runtime._orig_instance = Runtime.instance
+    Runtime.instance = classmethod(instance)
+
+def run(args):
+    import supabase
+    from streamlit import config
+    # script magic runs ast.parse on every rerun, which is not thread-safe on some CPython 3.11 builds;
+    # game.py does not rely on magic, so concurrent sessions run with it off
+    config.set_option("runner.magicEnabled", False)
+    share_runtime()
+    workdir = tempfile.mkdtemp(prefix="celeb-bench-")
+    llm = FakeOpenAIServer(args.latency, args.tokens_per_sec).start()
+    fake_db = FakeSupabaseClient()
+    supabase.create_client = lambda url, key: fake_db
+    os.environ.update({
+        "OPENAI_API_BASE": llm.url,
+        "OPENAI_API_KEY": "bench",
+        "CELEB_POOL_PATH": os.path.join(workdir, "celebrity_pool.db"),
+        "QUESTION_BANK_PATH": os.path.join(workdir, "question_bank.json"),
+        "RESPONSE_CACHE_PATH": os.path.join(workdir, "response_cache.db"),
+        "GAME_STATE_PATH": os.path.join(workdir, "game_state.db"),
+    })
+    results = Results()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    players = [Player(i, args, fake_db, results) for i in range(args.players)]
+    sem = threading.Semaphore(args.concurrency)
+
+    def play(p):
+        with sem:
+            try:
+                p.play()
+            except Exception as e:
+                results.record_error("play", repr(e))
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=play, args=(p,)) for p in players]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    llm.stop()
+
+    # the first run of a session is the name-entry screen before any game state exists, reported on its own
+    all_reruns = [v for label, values in results.latencies.items() if label != "load" for v in values]
+    report = {
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": git_commit(),
+        "config": vars(args),
+        "wall_seconds": round(wall, 2),
+        "rerun_latency": summarize(all_reruns),
+        "steps": {label: summarize(values) for label, values in sorted(results.latencies.items())},
+        "llm_calls_per_game": round(llm.requests / max(1, args.players), 2),
+        "llm_calls_by_kind": llm.by_kind,
+        "db_round_trips_per_guess": round(statistics.mean(results.db_per_guess), 2) if results.db_per_guess else 0.0,
+        "session_state_bytes": round(statistics.mean(results.session_bytes)) if results.session_bytes else 0,
+        "rss_growth_kb_per_session": round((rss_after - rss_before) / max(1, args.players), 1),
+        "errors": results.errors[:20],
+        "error_count": len(results.errors),
+    }
+    return report
+
+def compare(report, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        base = json.load(f)
+    failed = False
+    rows = [("rerun p50_ms", base["rerun_latency"]["p50_ms"], report["rerun_latency"]["p50_ms"]),
+            ("rerun p95_ms", base["rerun_latency"]["p95_ms"], report["rerun_latency"]["p95_ms"]),
+            ("rerun p99_ms", base["rerun_latency"]["p99_ms"], report["rerun_latency"]["p99_ms"]),
+            ("llm_calls_per_game", base["llm_calls_per_game"], report["llm_calls_per_game"]),
+            ("db_round_trips_per_guess", base["db_round_trips_per_guess"], report["db_round_trips_per_guess"])]
+    print(f"\ncompared with {baseline_path} ({base.get('commit')})")
+    for name, old, new in rows:
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            failed = True
+        print(f"  {name:26s} {old:>10} -> {new:<10} ({change:+.1%}){flag}")
+    return not failed
+
+def main():
+    ap = argparse.ArgumentParser(description="Drive game.py with simulated players against local LLM and Supabase stand-ins")
+    ap.add_argument("--players", type=int, default=10)
+    ap.add_argument("--concurrency", type=int, default=10, help="players in flight at once")
+    ap.add_argument("--rounds", type=int, default=2, help="rounds each player works through")
+    ap.add_argument("--asks", type=int, default=1, help="free-text questions per round")
+    ap.add_argument("--latency", type=float, default=0.2, help="fake LLM seconds before first token")
+    ap.add_argument("--tokens-per-sec", type=float, default=200.0)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--out", default=os.path.join(ROOT, "bench", "results"))
+    ap.add_argument("--compare", help="earlier result file to check for regressions")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative increase before flagging")
+    args = ap.parse_args()
+
+    report = run(args)
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"load-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({k: report[k] for k in ("rerun_latency", "llm_calls_per_game", "db_round_trips_per_guess",
+                                             "session_state_bytes", "rss_growth_kb_per_session", "error_count")}, indent=2))
+    print(f"saved {path}")
+    if args.compare and not compare(report, args.compare, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import random
+import sqlite3
+import threading
+import time
+
+from score_store import player_key
+
+class CelebrityPool:
+    def __init__(self, path="celebrity_pool.db", refill=None, low_water=40, refill_interval=60.0):
+        self.refill = refill
+        self.low_water = low_water
+        self.refill_interval = refill_interval
+        self.lock = threading.Lock()
+        self.refilling = set()
+        self.last_refill = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS celebrities ("
+                "industry TEXT NOT NULL, difficulty TEXT NOT NULL, name TEXT NOT NULL, "
+                "served INTEGER NOT NULL DEFAULT 0, added_at REAL, "
+                "PRIMARY KEY (industry, difficulty, name))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                "player_key TEXT NOT NULL, name TEXT NOT NULL, seen_at REAL, "
+                "PRIMARY KEY (player_key, name))"
+            )
+
+    def add(self, industry, difficulty, names):
+        rows = [(industry, difficulty, n.strip(), time.time()) for n in names if isinstance(n, str) and n.strip()]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO celebrities (industry, difficulty, name, added_at) VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def count(self, industry, difficulty):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM celebrities WHERE industry = ? AND difficulty = ?", (industry, difficulty)
+            ).fetchone()
+        return row[0]
+
+    def sample(self, industries, difficulty, k=6, player=None):
+        if not industries:
+            return []
+        marks = ",".join("?" * len(industries))
+        pkey = player_key(player) if player else ""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT c.name, MIN(c.served), MAX(s.name IS NOT NULL) FROM celebrities c "
+                f"LEFT JOIN seen s ON s.player_key = ? AND s.name = c.name "
+                f"WHERE c.difficulty = ? AND c.industry IN ({marks}) GROUP BY c.name",
+                [pkey, difficulty, *industries],
+            ).fetchall()
+        fresh = [(n, served) for n, served, seen in rows if not seen]
+        stale = [(n, served) for n, served, seen in rows if seen]
+        picks = self._weighted(fresh, k)
+        if len(picks) < k:
+            # player has seen most of this bucket; repeat the least served rather than come up short
+            picks += self._weighted(stale, k - len(picks))
+        if len(picks) < k:
+            # a short bucket means the caller plays the fallback list, so these names were never served
+            return picks
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"UPDATE celebrities SET served = served + 1 WHERE name = ? AND difficulty = ? AND industry IN ({marks})",
+                [(n, difficulty, *industries) for n in picks],
+            )
+            if pkey:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO seen (player_key, name, seen_at) VALUES (?, ?, ?)",
+                    [(pkey, n, now) for n in picks],
+                )
+        return picks
+
+    def _weighted(self, items, k):
+        # Efraimidis-Spirakis: weighted sampling without replacement, rarely served names weigh more
+        keyed = [(random.random() ** (1.0 + served), name) for name, served in items]
+        keyed.sort(reverse=True)
+        return [name for _, name in keyed[:k]]
+
+    def ensure_stocked(self, industries, difficulty):
+        if not self.refill:
+            return
+        for industry in industries:
+            if self.count(industry, difficulty) >= self.low_water:
+                continue
+            key = (industry, difficulty)
+            with self.lock:
+                if key in self.refilling or time.monotonic() - self.last_refill.get(key, -self.refill_interval) < self.refill_interval:
+                    continue
+                self.refilling.add(key)
+                self.last_refill[key] = time.monotonic()
+            threading.Thread(target=self._refill, args=key, name="celebrity-pool-refill", daemon=True).start()
+
+    def _refill(self, industry, difficulty):
+        try:
+            self.add(industry, difficulty, self.refill(industry, difficulty) or [])
+        except Exception:
+            pass
+        finally:
+            with self.lock:
+                self.refilling.discard((industry, difficulty))
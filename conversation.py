@@ -0,0 +1,62 @@
+import re
+
+from response_cache import estimate_tokens
+
+def first_sentence(text, limit):
+    text = " ".join(str(text or "").split())
+    m = re.match(r"(.+?[.!?])(\s|$)", text)
+    s = m.group(1) if m else text
+    return s if len(s) <= limit else s[:limit - 3].rstrip() + "..."
+
+class Conversation:
+    def __init__(self, budget=1000, keep_turns=4, summary_budget=200):
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.summary_budget = summary_budget
+        self.turns = []
+        self.summary = []
+        self.prompt_tokens = []
+
+    def add(self, user, assistant):
+        self.turns.append([user, assistant])
+        self.compact()
+
+    def compact(self):
+        # oldest turns beyond the verbatim window, or beyond the token budget, collapse into one-line notes
+        while self.turns and (len(self.turns) > self.keep_turns or
+                              (len(self.turns) > 1 and self.tokens() > self.budget)):
+            user, assistant = self.turns.pop(0)
+            self.summary.append(f"Fan asked: {first_sentence(user, 80)} You said: {first_sentence(assistant, 120)}")
+        while len(self.summary) > 1 and estimate_tokens(" ".join(self.summary)) > self.summary_budget:
+            self.summary.pop(0)
+
+    def tokens(self):
+        return sum(estimate_tokens(u) + estimate_tokens(a) for u, a in self.turns) + estimate_tokens(" ".join(self.summary))
+
+    def messages(self, system, user_prompt):
+        # system prompt stays first and unchanged so provider-side prefix caching can hit across turns
+        msgs = [{"role": "system", "content": system}]
+        if self.summary:
+            msgs.append({"role": "system", "content": "Earlier in this chat: " + " ".join(self.summary)})
+        for user, assistant in self.turns:
+            msgs.append({"role": "user", "content": user})
+            msgs.append({"role": "assistant", "content": assistant})
+        msgs.append({"role": "user", "content": user_prompt})
+        return msgs
+
+    def record_prompt(self, messages):
+        n = sum(estimate_tokens(m["content"]) for m in messages)
+        self.prompt_tokens.append(n)
+        del self.prompt_tokens[:-20]
+        return n
+
+    def to_dict(self):
+        return {"t": [list(t) for t in self.turns], "s": list(self.summary), "p": list(self.prompt_tokens)}
+
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        conv = cls(**kwargs)
+        conv.turns = [list(t) for t in data.get("t", [])]
+        conv.summary = list(data.get("s", []))
+        conv.prompt_tokens = list(data.get("p", []))
+        return conv
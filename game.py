@@ -1,27 +1,23 @@
-import ssl
-ssl._create_default_https_context = ssl._create_unverified_context
-
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-import requests
-_orig_Session = requests.Session
-class UnsafeSession(_orig_Session):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.verify = False
-requests.Session = UnsafeSession
-
 import streamlit as st
-import streamlit.components.v1 as components
-import openai
 import random
 import os
 import time
 import json
-from supabase import create_client
-from datetime import datetime
-import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import celebrity_pool
+import conversation
+import game_state
+import guess_matcher
+import llm_client
+import metrics
+import question_bank
+import response_cache
+import score_store
+import ttl_cache
+
+metrics.begin_rerun()
 
 st.set_page_config(page_title="🎭 Guess the Celebrity", layout="wide")
 st.markdown("""
@@ -33,8 +29,37 @@ div.stMarkdown, .stText, .stButton, .stDataFrame, .stTable, .stSelectbox, .stMul
 </style>
 """, unsafe_allow_html=True)
 
-openai.api_key = os.environ.get("OPENAI_API_KEY","")
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL","gpt-4o")
+LLM_STREAM = os.environ.get("LLM_STREAM","1") != "0"
+
+@st.cache_resource
+def get_llm():
+    if os.environ.get("LLM_BACKEND", "").lower() == "fake":
+        backend = llm_client.FakeBackend(latency=float(os.environ.get("LLM_FAKE_LATENCY", "0")))
+    else:
+        backend = llm_client.OpenAIBackend(
+            os.environ.get("OPENAI_API_KEY", ""),
+            api_base=os.environ.get("OPENAI_API_BASE") or None,
+            verify=os.environ.get("OPENAI_VERIFY_SSL", "0") != "0",
+        )
+    rate = float(os.environ.get("LLM_RATE_PER_SEC", "0") or 0)
+    p95 = float(os.environ.get("LLM_BREAKER_P95", "10") or 0)
+    breaker = llm_client.CircuitBreaker(
+        window=int(os.environ.get("LLM_BREAKER_WINDOW", "20")),
+        error_rate=float(os.environ.get("LLM_BREAKER_ERROR_RATE", "0.5")),
+        latency_p95=p95 or None,
+        cooldown=float(os.environ.get("LLM_BREAKER_COOLDOWN", "15")),
+    )
+    return llm_client.LLMClient(
+        backend,
+        OPENAI_MODEL,
+        timeout=float(os.environ.get("LLM_TIMEOUT", "20")),
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", "3")),
+        max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "16")),
+        rate_per_sec=rate or None,
+        on_usage=metrics.record_usage,
+        breaker=breaker,
+    )
 
 def safe_create_client():
     try:
@@ -42,6 +67,8 @@ def safe_create_client():
         key = st.secrets.get("SUPABASE_KEY", "")
         if not url or not key:
             return None
+        # supabase pulls in httpx and friends, so it loads with the first client rather than with the page
+        from supabase import create_client
         return create_client(url, key)
     except Exception:
         return None
@@ -50,61 +77,157 @@ def safe_create_client():
 def get_supabase():
     return safe_create_client()
 
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=12, thread_name_prefix="prefetch")
+
+def chain_future(src, dst):
+    def copy(done):
+        try:
+            dst.set_result(done.result())
+        except Exception as e:
+            dst.set_exception(e)
+    src.add_done_callback(copy)
+
+def start_round_prefetch(celebs, prev_used):
+    ex = get_prefetch_executor()
+    # cached resources resolve here on the script thread; the workers have no script context to look them up
+    llm, cache, bank = get_llm(), get_response_cache(), get_question_bank()
+    used = set(prev_used)
+    futures = {}
+    for i in range(len(celebs)):
+        futures[f"intro_{i}"] = Future()
+        futures[f"qset_{i}"] = Future()
+
+    def fan_out(batch):
+        try:
+            content = batch.result()
+        except Exception:
+            content = {}
+        for i, celeb in enumerate(celebs):
+            entry = content.get(i)
+            if entry:
+                futures[f"intro_{i}"].set_result(entry["intro"])
+                futures[f"qset_{i}"].set_result(entry["questions"])
+                continue
+            # entries the batch missed or got wrong are regenerated one by one
+            chain_future(ex.submit(generate_intro, celeb, llm=llm, cache=cache), futures[f"intro_{i}"])
+            chain_future(ex.submit(generate_generic_questions, used, bank=bank), futures[f"qset_{i}"])
+
+    ex.submit(generate_round_content, celebs, llm=llm, cache=cache).add_done_callback(fan_out)
+    # the session pops entries as it collects them, so it gets its own view of the futures
+    return dict(futures)
+
+def collect_prefetched(key, wait=False):
+    if key in st.session_state:
+        return True
+    fut = st.session_state.get("prefetch", {}).get(key)
+    if fut is None:
+        return False
+    if not wait and not fut.done():
+        return False
+    st.session_state.prefetch.pop(key, None)
+    try:
+        st.session_state[key] = fut.result()
+    except Exception:
+        return False
+    return True
+
+@st.cache_resource
+def get_score_store():
+    backend = os.environ.get("SCORE_BACKEND", "").lower()
+    if backend == "sqlite":
+        return score_store.SQLiteScoreStore(os.environ.get("SCORE_DB_PATH", "leaderboard.db"))
+    if backend == "memory":
+        return score_store.MemoryScoreStore()
+    sb = get_supabase()
+    if not sb:
+        return None
+    return score_store.SupabaseScoreStore(sb)
+
+@st.cache_resource
+def get_read_cache():
+    return ttl_cache.TTLCache(ttl=float(os.environ.get("READ_CACHE_TTL", "5")))
+
+def invalidate_scores(players):
+    get_read_cache().invalidate("leaderboard", *[f"score:{score_store.player_key(p)}" for p in players])
+
+@st.cache_resource
+def get_score_buffer():
+    flush_ms = int(os.environ.get("SCORE_WRITE_BEHIND_MS", "0") or 0)
+    store = get_score_store()
+    if flush_ms <= 0 or not store:
+        return None
+    return score_store.WriteBehindBuffer(
+        store,
+        flush_ms=flush_ms,
+        max_entries=int(os.environ.get("SCORE_WRITE_BEHIND_MAX", "200")),
+        on_flush=invalidate_scores,
+    )
+
+@metrics.timed()
 def upsert_score(player, points_to_add):
     try:
-        sb = get_supabase()
-        if not sb:
+        store = get_score_store()
+        if not store:
             return
-
-        # fetch current score case-insensitive
-        data = sb.table("leaderboard").select("score,player")\
-                   .ilike("player", player).limit(1).execute().data
-
-        if data:
-            current_score = int(data[0].get("score", 0))
-            db_name = data[0].get("player")  # keep the stored name spelling
-            new_score = current_score + int(points_to_add)
-            sb.table("leaderboard").update(
-                {"score": new_score, "updated_at": datetime.utcnow().isoformat()}
-            ).ilike("player", player).execute()
-        else:
-            # new player, insert fresh
-            sb.table("leaderboard").insert({
-                "player": player,
-                "score": int(points_to_add),
-                "updated_at": datetime.utcnow().isoformat()
-            }).execute()
+        buf = get_score_buffer()
+        if buf:
+            buf.add(player, points_to_add)
+            return
+        store.increment(player, points_to_add)
+        invalidate_scores([player])
     except Exception:
-        pass
-
+        metrics.fallback("upsert_score")
 
+@metrics.timed()
 def get_player_score_from_db(player):
     try:
-        sb = get_supabase()
-        if not sb:
+        store = get_score_store()
+        if not store:
             return 0
-        data = sb.table("leaderboard").select("score").eq("player", player).limit(1).execute().data
-        if data:
-            return int(data[0].get("score", 0))
+        buf = get_score_buffer()
+        pending = buf.pending_points(player) if buf else 0
+        base = get_read_cache().get_or_load(f"score:{score_store.player_key(player)}", lambda: store.get(player))
+        return base + pending
     except Exception:
-        pass
+        metrics.fallback("get_player_score_from_db")
     return 0
 
-def fetch_leaderboard_df():
+def to_score(value):
     try:
-        sb = get_supabase()
-        if not sb:
-            return pd.DataFrame(columns=["player","score"])
-        data = sb.table("leaderboard").select("player,score").order("score", desc=True).limit(100).execute().data
-        if not data:
-            return pd.DataFrame(columns=["player","score"])
-        df = pd.DataFrame(data)
-        df = df[["player","score"]].copy()
-        df["score"] = pd.to_numeric(df["score"], errors="coerce").fillna(0).astype(int)
-        df = df.sort_values("score", ascending=False, kind="mergesort").reset_index(drop=True)
-        return df
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+def load_leaderboard_rows(store):
+    rows = [{"Player": r.get("player"), "Score": to_score(r.get("score"))} for r in store.top(100) or []]
+    rows.sort(key=lambda r: r["Score"], reverse=True)
+    return rows
+
+@metrics.timed()
+def fetch_leaderboard_rows():
+    try:
+        store = get_score_store()
+        if not store:
+            return []
+        return get_read_cache().get_or_load("leaderboard", lambda: load_leaderboard_rows(store))
     except Exception:
-        return pd.DataFrame(columns=["player","score"])
+        metrics.fallback("fetch_leaderboard_rows")
+        return []
+
+@st.cache_resource
+def get_autorefresh():
+    from streamlit_autorefresh import st_autorefresh
+    return st_autorefresh
+
+@st.cache_resource
+def get_realtime_component():
+    import streamlit.components.v1 as components
+    return components.declare_component(
+        "realtime_widget",
+        path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "realtime_widget"),
+    )
 
 def supabase_realtime_leaderboard_widget():
     try:
@@ -112,58 +235,7 @@ def supabase_realtime_leaderboard_widget():
         anon = st.secrets.get("SUPABASE_ANON","")
         if not url or not anon:
             return False
-        html = f"""
-        <html>
-        <head>
-        <script src="https://unpkg.com/@supabase/supabase-js@2"></script>
-        <style>
-          body {{ margin:0; font-family:system-ui, Arial; background:#ffffff; color:#111827; }}
-          .wrap {{ padding:8px }}
-          table {{ width:100%; border-collapse:collapse; font-size:14px }}
-          th, td {{ text-align:left; padding:8px }}
-          th {{ border-bottom:1px solid #e5e7eb }}
-          tr:nth-child(even) {{ background:#fafafa }}
-          tr.gold td {{ background:#FFD700 !important }}
-          tr.silver td {{ background:#C0C0C0 !important }}
-          tr.bronze td {{ background:#CD7F32 !important }}
-          .title {{ font-weight:600; margin-bottom:6px }}
-        </style>
-        </head>
-        <body>
-          <div class="wrap">
-            <div class="title">🏆 Leaderboard</div>
-            <table id="lb">
-              <thead><tr><th>Player</th><th>Score</th></tr></thead>
-              <tbody></tbody>
-            </table>
-          </div>
-          <script>
-            const client = supabase.createClient("{url}", "{anon}");
-            async function load() {{
-              const {{ data, error }} = await client.from('leaderboard').select('player,score').order('score', {{ ascending: false }}).limit(100);
-              if (error) return;
-              render(data || []);
-            }}
-            function render(rows) {{
-              const tbody = document.querySelector('#lb tbody');
-              tbody.innerHTML = '';
-              rows.sort((a,b) => (b.score||0) - (a.score||0));
-              rows.forEach((r,i) => {{
-                const tr = document.createElement('tr');
-                if (i===0) tr.className = 'gold';
-                else if (i===1) tr.className = 'silver';
-                else if (i===2) tr.className = 'bronze';
-                tr.innerHTML = `<td>${{r.player||''}}</td><td>${{r.score||0}}</td>`;
-                tbody.appendChild(tr);
-              }});
-            }}
-            load();
-            client.channel('lb_changes').on('postgres_changes', {{ event: '*', schema: 'public', table: 'leaderboard' }}, payload => load()).subscribe();
-          </script>
-        </body>
-        </html>
-        """
-        components.html(html, height=420, scrolling=False)
+        get_realtime_component()(mode="leaderboard", url=url, anon=anon, height=420, key="rt_leaderboard", default=None)
         return True
     except Exception:
         return False
@@ -174,55 +246,17 @@ def supabase_realtime_player_score_widget(player_name):
         anon = st.secrets.get("SUPABASE_ANON","")
         if not url or not anon or not player_name:
             return False
-        html = f"""
-        <html>
-        <head>
-        <script src="https://unpkg.com/@supabase/supabase-js@2"></script>
-        <style>
-          body {{ margin:0; font-family:system-ui, Arial; background:#ffffff; color:#111827; }}
-          .wrap {{ text-align:right; padding:6px 0 }}
-          .label {{ color:#6b7280; margin-right:10px }}
-          .val {{ font-weight:700 }}
-        </style>
-        </head>
-        <body>
-          <div class="wrap"><span class="label">Score:</span><span id="score" class="val">0</span></div>
-          <script>
-            const client = supabase.createClient("{url}", "{anon}");
-            const player = {json.dumps(player_name)};
-            async function load() {{
-              const {{ data, error }} = await client.from('leaderboard').select('score').eq('player', player).limit(1).maybeSingle();
-              if (error) return;
-              document.querySelector('#score').textContent = data && data.score != null ? data.score : 0;
-            }}
-            load();
-            client.channel('me_changes').on('postgres_changes', {{ event: '*', schema: 'public', table: 'leaderboard', filter: `player=eq.${{player}}` }}, payload => load()).subscribe();
-          </script>
-        </body>
-        </html>
-        """
-        components.html(html, height=32, scrolling=False)
+        get_realtime_component()(mode="score", url=url, anon=anon, player=player_name, height=32, key="rt_score", default=None)
         return True
     except Exception:
         return False
 
-def llm_json(prompt, temperature=0.6):
+@metrics.timed(OPENAI_MODEL)
+def llm_json(prompt, temperature=0.6, llm=None):
     try:
-        r = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": "Reply only with valid JSON."},
-                      {"role": "user", "content": prompt}],
-            temperature=temperature
-        )
-        txt = r.choices[0].message.content.strip()
-        try:
-            return json.loads(txt)
-        except Exception:
-            s = txt.strip().strip("`").strip()
-            if "[" in s and "]" in s:
-                s = s[s.find("["): s.rfind("]")+1]
-            return json.loads(s)
+        return (llm if llm is not None else get_llm()).complete_json(prompt, temperature)
     except Exception:
+        metrics.fallback("llm_json")
         return []
 
 def select_difficulty_params(level):
@@ -232,113 +266,349 @@ def select_difficulty_params(level):
         return {"obscurity_min": 3, "obscurity_max": 6, "points": 3}
     return {"obscurity_min": 6, "obscurity_max": 9, "points": 5}
 
-def generate_random_celebrities(selected_industries, difficulty):
+@metrics.timed(OPENAI_MODEL)
+def fetch_celebrity_candidates(industry, difficulty, llm=None):
+    params = select_difficulty_params(difficulty)
+    prompt = (
+        f'Return a JSON array of 24 unique celebrity names from only this film industry: {industry}. '
+        f'Balance genders. Choose names with an obscurity score from {params["obscurity_min"]} to {params["obscurity_max"]}. '
+        f'Output format: ["Name 1","Name 2", "..."].'
+    )
+    arr = llm_json(prompt, temperature=0.5, llm=llm)
+    return list(dict.fromkeys(n.strip() for n in arr if isinstance(n, str) and n.strip()))
+
+@st.cache_resource
+def get_celebrity_pool():
+    return celebrity_pool.CelebrityPool(
+        os.environ.get("CELEB_POOL_PATH", "celebrity_pool.db"),
+        refill=partial(fetch_celebrity_candidates, llm=get_llm()),
+    )
+
+@metrics.timed()
+def generate_random_celebrities(selected_industries, difficulty, player=None):
     try:
-        params = select_difficulty_params(difficulty)
-        joined = ", ".join(selected_industries)
-        prompt = (
-            f'Return a JSON array of 24 unique celebrity names from only these film industries: {joined}. '
-            f'Balance genders. Choose names with an obscurity score from {params["obscurity_min"]} to {params["obscurity_max"]}. '
-            f'Output format: ["Name 1","Name 2", "..."].'
-        )
-        arr = llm_json(prompt, temperature=0.5)
-        pool = [n for n in arr if isinstance(n, str) and n.strip()]
-        pool = list(dict.fromkeys(pool))
-        random.shuffle(pool)
-        if len(pool) >= 6:
-            return pool[:6]
+        pool = get_celebrity_pool()
+        picks = pool.sample(selected_industries, difficulty, 6, player)
+        pool.ensure_stocked(selected_industries, difficulty)
+        if len(picks) >= 6:
+            random.shuffle(picks)
+            return picks
     except Exception:
         pass
+    metrics.fallback("generate_random_celebrities")
     fallbacks = ["Shah Rukh Khan", "Emma Watson", "Leonardo DiCaprio", "Fahadh Faasil", "Scarlett Johansson", "Mammootty"]
     random.shuffle(fallbacks)
     return fallbacks[:6]
 
-def generate_intro(celebrity):
+def record_llm_timing(kind, ttft, total, streamed):
+    metrics.observe("app_llm_total_seconds", total, kind=kind, model=OPENAI_MODEL, streamed=streamed)
+    if ttft is not None:
+        metrics.observe("app_llm_ttft_seconds", ttft, kind=kind, model=OPENAI_MODEL, streamed=streamed)
+    # prefetch workers have no script context, and session state written from them would go nowhere
+    if get_script_run_ctx() is None:
+        return
+    try:
+        timings = st.session_state.setdefault("llm_timings", [])
+        timings.append({"kind": kind, "ttft": ttft, "total": total, "streamed": streamed})
+        del timings[:-50]
+    except Exception:
+        pass
+
+def chat_text(messages, temperature, on_text=None, kind="chat", llm=None):
+    llm = llm if llm is not None else get_llm()
+    t0 = time.perf_counter()
+    if on_text is not None and LLM_STREAM:
+        parts = []
+        ttft = None
+        try:
+            for delta in llm.stream(messages, temperature):
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                parts.append(delta)
+                on_text("".join(parts))
+        except Exception as e:
+            # a stream that broke mid-answer keeps what arrived; one that never started falls back to a blocking
+            # call only if streaming itself was the problem, a slow or refusing provider would just fail again
+            if not parts and llm.transient(e):
+                raise
+        text = "".join(parts).strip()
+        if text:
+            record_llm_timing(kind, ttft, time.perf_counter() - t0, True)
+            # streamed completions carry no usage block, so charge an estimate
+            metrics.record_usage(OPENAI_MODEL, {
+                "prompt_tokens": sum(response_cache.estimate_tokens(m["content"]) for m in messages),
+                "completion_tokens": response_cache.estimate_tokens(text),
+            })
+            return text
+    text = llm.complete(messages, temperature)
+    total = time.perf_counter() - t0
+    record_llm_timing(kind, total, total, False)
+    return text
+
+@st.cache_resource
+def get_response_cache():
+    return response_cache.ResponseCache(
+        maxsize=int(os.environ.get("RESPONSE_CACHE_SIZE", "5000")),
+        variants=int(os.environ.get("RESPONSE_CACHE_VARIANTS", "3")),
+        path=os.environ.get("RESPONSE_CACHE_PATH", "response_cache.db") or None,
+    )
+
+def cached_chat_text(celebrity, cache_prompt, messages, temperature, on_text, kind, namespace=None,
+                     llm=None, cache=None):
+    llm = llm if llm is not None else get_llm()
+    cache = cache if cache is not None else get_response_cache()
+    prompt_tokens = sum(response_cache.estimate_tokens(m["content"]) for m in messages)
+    # with the model unavailable any cached take beats a placeholder, even before the usual variety exists
+    min_variants = 1 if llm.degraded() else None
+    text = cache.get(celebrity, cache_prompt, prompt_tokens, namespace=namespace, min_variants=min_variants)
+    if text is not None:
+        return text
+    text = chat_text(messages, temperature, on_text, kind, llm)
+    cache.put(celebrity, cache_prompt, text, namespace=namespace)
+    return text
+
+@metrics.timed(OPENAI_MODEL)
+def generate_intro(celebrity, on_text=None, llm=None, cache=None):
     try:
         sys = f'You are {celebrity}. Do not state your name. Speak naturally for 2 to 4 sentences and give subtle hints without names.'
-        r = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": sys},
-                      {"role": "user", "content": "Introduce yourself to a fan who is trying to guess you."}],
-            temperature=0.8
-        )
-        return r.choices[0].message.content.strip()
+        return cached_chat_text(celebrity, None,
+                                [{"role": "system", "content": sys},
+                                 {"role": "user", "content": "Introduce yourself to a fan who is trying to guess you."}],
+                                0.8, on_text, "intro", namespace="intro", llm=llm, cache=cache)
     except Exception:
+        metrics.fallback("generate_intro")
         return "(Intro unavailable)"
 
-def generate_response(celebrity, user_prompt):
+def new_conversation(data=None):
+    kwargs = dict(
+        budget=int(os.environ.get("CONVERSATION_TOKEN_BUDGET", "1000")),
+        keep_turns=int(os.environ.get("CONVERSATION_KEEP_TURNS", "4")),
+    )
+    if data is not None:
+        return conversation.Conversation.from_dict(data, **kwargs)
+    return conversation.Conversation(**kwargs)
+
+@metrics.timed(OPENAI_MODEL)
+def generate_response(celebrity, user_prompt, on_text=None, memory=None):
     try:
         sys = f'You are {celebrity}. Stay in character. Be clear and friendly. Do not reveal your name.'
-        r = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": sys},
-                      {"role": "user", "content": user_prompt}],
-            temperature=0.9
-        )
-        return r.choices[0].message.content.strip()
+        memory = memory if memory is not None else new_conversation()
+        messages = memory.messages(sys, user_prompt)
+        memory.record_prompt(messages)
+        if memory.turns or memory.summary:
+            reply = chat_text(messages, 0.9, on_text, "response")
+        else:
+            # only an opening question is context-free enough to share cached answers
+            reply = cached_chat_text(celebrity, user_prompt, messages, 0.9, on_text, "response")
+        memory.add(user_prompt, reply)
+        return reply
     except Exception:
+        metrics.fallback("generate_response")
         return "Unable to answer now"
 
-def generate_generic_questions(prev_used):
+FALLBACK_QUESTIONS = [
+    "Are you known more for serious roles or lighter roles",
+    "Have you worked in both television and films",
+    "Have you performed in more than one language",
+    "Do you often collaborate with the same directors",
+    "Have you done voice acting for animation",
+    "Do you take on physically demanding roles",
+    "Are you known for a signature on screen style",
+    "Have you tried directing or producing",
+    "Do you prefer ensemble casts or solo lead roles"
+]
+
+@metrics.timed(OPENAI_MODEL)
+def fetch_generic_questions(llm=None):
     prompt = (
-        "Return a JSON array of exactly 5 short generic questions a fan could ask any film celebrity to identify them without revealing the name. "
-        "Do not reference specific people or works by name. Output format: [\"Q1\",\"Q2\",\"Q3\",\"Q4\",\"Q5\"]."
+        "Return a JSON array of exactly 20 short generic questions a fan could ask any film celebrity to identify them without revealing the name. "
+        "Do not reference specific people or works by name. Output format: [\"Q1\",\"Q2\",\"...\"]."
+    )
+    qs = llm_json(prompt, temperature=0.9, llm=llm)
+    return [q for q in qs if isinstance(q, str) and q.strip()]
+
+@st.cache_resource
+def get_question_bank():
+    bank = question_bank.QuestionBank(
+        os.environ.get("QUESTION_BANK_PATH", "question_bank.json"),
+        seed=FALLBACK_QUESTIONS,
+        refill=partial(fetch_generic_questions, llm=get_llm()),
     )
-    qs = llm_json(prompt, temperature=0.9)
-    qs = [q for q in qs if isinstance(q, str) and q.strip()]
-    fallback = [
-        "Are you known more for serious roles or lighter roles",
-        "Have you worked in both television and films",
-        "Have you performed in more than one language",
-        "Do you often collaborate with the same directors",
-        "Have you done voice acting for animation",
-        "Do you take on physically demanding roles",
-        "Are you known for a signature on screen style",
-        "Have you tried directing or producing",
-        "Do you prefer ensemble casts or solo lead roles"
-    ]
-    random.shuffle(fallback)
-    for q in fallback:
-        if len(qs) >= 7:
-            break
-        if q not in qs:
-            qs.append(q)
+    bank.refresh_async()
+    return bank
+
+@metrics.timed()
+def generate_generic_questions(prev_used, bank=None):
     out = []
-    random.shuffle(qs)
-    for q in qs:
-        if q not in prev_used and q not in out:
-            out.append(q)
-        if len(out) == 3:
-            break
+    try:
+        bank = bank if bank is not None else get_question_bank()
+        out = bank.draw(prev_used, 3)
+        bank.refresh_async()
+    except Exception:
+        metrics.fallback("generate_generic_questions")
     while len(out) < 3:
         out.append(f"Do you enjoy roles that challenge you creatively {len(out)+1}")
     return out[:3]
 
-def generate_congrats_line_named(celebrity):
+def valid_round_entry(entry, celebrity):
+    if not isinstance(entry, dict):
+        return None
+    intro = entry.get("intro")
+    questions = entry.get("questions")
+    if not isinstance(intro, str) or not intro.strip() or not isinstance(questions, list):
+        return None
+    questions = [q.strip() for q in questions if isinstance(q, str) and q.strip()]
+    if len(questions) < 3:
+        return None
+    name = guess_matcher.normalize(celebrity)
+    if name and name in guess_matcher.normalize(intro):
+        return None
+    return {"intro": intro.strip(), "questions": questions[:3]}
+
+@metrics.timed(OPENAI_MODEL)
+def generate_round_content(celebs, llm=None, cache=None):
+    prompt = (
+        f"For each of these film celebrities: {json.dumps(celebs)}, write an intro in the first person as that celebrity, "
+        "2 to 4 natural sentences to a fan who is trying to guess them, with subtle hints and never stating their own name. "
+        "Also give 3 short generic questions the fan could ask to identify them, without naming people or works. "
+        'Output format: {"rounds": [{"name": "Name", "intro": "...", "questions": ["Q1","Q2","Q3"]}]}.'
+    )
+    data = llm_json(prompt, temperature=0.8, llm=llm)
+    rounds = data.get("rounds", []) if isinstance(data, dict) else data
+    if not isinstance(rounds, list):
+        return {}
+    by_name = {guess_matcher.normalize(c): i for i, c in enumerate(celebs)}
+    out = {}
+    cache = cache if cache is not None else get_response_cache()
+    for entry in rounds:
+        i = by_name.get(guess_matcher.normalize(entry.get("name", ""))) if isinstance(entry, dict) else None
+        if i is None or i in out:
+            continue
+        valid = valid_round_entry(entry, celebs[i])
+        if valid:
+            out[i] = valid
+            cache.put(celebs[i], None, valid["intro"], namespace="intro")
+    return out
+
+@metrics.timed(OPENAI_MODEL)
+def generate_congrats_line_named(celebrity, on_text=None):
     try:
         sys = f'You are {celebrity}. The fan guessed correctly. Say a short one line congrats and you may confirm your name.'
-        r = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": sys},
-                      {"role": "user", "content": "One line only."}],
-            temperature=0.8
-        )
-        return r.choices[0].message.content.strip()
+        return chat_text([{"role": "system", "content": sys},
+                          {"role": "user", "content": "One line only."}],
+                         0.8, on_text, "congrats")
     except Exception:
+        metrics.fallback("generate_congrats_line_named")
         return f"Well done. I am {celebrity}."
 
+@metrics.timed(OPENAI_MODEL)
 def check_guess_llm(user_input, actual_name):
     try:
         p = f"User guess: '{user_input}'. Correct name: '{actual_name}'. Reply exactly yes or no if the guess refers to the correct celebrity, allowing partials and misspellings."
-        r = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": "Reply only yes or no."},
-                      {"role": "user", "content": p}],
-            temperature=0
-        )
-        return "yes" in r.choices[0].message.content.strip().lower()
+        reply = get_llm().complete([{"role": "system", "content": "Reply only yes or no."},
+                                    {"role": "user", "content": p}], 0)
+        return "yes" in reply.lower()
+    except Exception:
+        metrics.fallback("check_guess_llm")
+        return None
+
+def check_guess(user_input, actual_name):
+    return guess_matcher.match_guess(user_input, actual_name, check_guess_llm)
+
+@st.cache_resource
+def get_game_store():
+    path = os.environ.get("GAME_STATE_PATH", "game_state.db")
+    backend = game_state.SQLiteGameBackend(path) if path else game_state.MemoryGameBackend()
+    return game_state.GameStore(
+        backend,
+        maxsize=int(os.environ.get("GAME_STATE_CACHE_SIZE", "2000")),
+        idle_ttl=float(os.environ.get("GAME_STATE_IDLE_SECONDS", "1800")),
+        retention=float(os.environ.get("GAME_STATE_RETENTION_DAYS", "7")) * 86400,
+    )
+
+def game_record():
+    # short keys and one field per round item keep records small and let a rerun rewrite only what changed
+    ss = st.session_state
+    record = {
+        "p": ss.player_name,
+        "x": list(ss.selected_industries),
+        "d": ss.difficulty,
+        "c": list(ss.celebrity_rounds),
+        "g": [int(v) for v in ss.guessed],
+        "l": [int(v) for v in ss.locked],
+        "n": list(ss.guess_counts),
+        "u": sorted(ss.used_generic_qs),
+    }
+    for i in range(6):
+        if f"intro_{i}" in ss:
+            record[f"i{i}"] = ss[f"intro_{i}"]
+        if f"qset_{i}" in ss:
+            record[f"q{i}"] = ss[f"qset_{i}"]
+        if f"conv_{i}" in ss:
+            record[f"m{i}"] = ss[f"conv_{i}"].to_dict()
+    return record
+
+def save_game():
+    game_id = st.session_state.get("game_id")
+    if not game_id or st.session_state.player_name is None:
+        return
+    try:
+        get_game_store().save(game_id, game_record())
+    except Exception:
+        metrics.fallback("save_game")
+
+def restore_game(game_id):
+    try:
+        record = get_game_store().load(game_id)
     except Exception:
+        metrics.fallback("restore_game")
         return False
+    if not record or not record.get("p") or not record.get("c"):
+        return False
+    ss = st.session_state
+    ss.player_name = record["p"]
+    ss.selected_industries = record.get("x", [])
+    ss.difficulty = record.get("d", "Medium")
+    ss.celebrity_rounds = record["c"]
+    ss.guessed = [bool(v) for v in record.get("g", [0] * 6)]
+    ss.locked = [bool(v) for v in record.get("l", [0] * 6)]
+    ss.guess_counts = record.get("n", [0] * 6)
+    ss.used_generic_qs = set(record.get("u", []))
+    for i in range(6):
+        if f"i{i}" in record:
+            ss[f"intro_{i}"] = record[f"i{i}"]
+        if f"q{i}" in record:
+            ss[f"qset_{i}"] = record[f"q{i}"]
+        if f"m{i}" in record:
+            ss[f"conv_{i}"] = new_conversation(record[f"m{i}"])
+    ss.game_id = game_id
+    return True
+
+@st.cache_resource
+def init_metrics():
+    metrics.register_collector("llm", lambda: get_llm().get_stats())
+    metrics.register_collector("read_cache", lambda: get_read_cache().get_stats())
+    metrics.register_collector("response_cache", lambda: get_response_cache().get_stats())
+    metrics.register_collector("guess_matcher", guess_matcher.get_stats)
+    metrics.register_collector("question_bank", lambda: {"size": get_question_bank().size()})
+    metrics.register_collector("game_state", lambda: get_game_store().get_stats())
+    port = int(os.environ.get("METRICS_PORT", "0") or 0)
+    if port:
+        try:
+            return metrics.start_http_server(port)
+        except OSError:
+            return None
+    return None
+
+def render_debug_sidebar(total, trace):
+    with st.sidebar:
+        st.subheader("Rerun timings")
+        st.markdown(f"**Total:** {total*1000:.0f} ms")
+        if trace:
+            st.table([{"call": "  " * t["depth"] + t["function"], "ms": round(t["seconds"] * 1000, 1)} for t in trace])
+        st.json(metrics.snapshot()["gauges"], expanded=False)
+
+init_metrics()
 
 if "player_name" not in st.session_state:
     st.session_state.player_name = None
@@ -358,6 +628,14 @@ if "guess_counts" not in st.session_state:
     st.session_state.guess_counts = [0]*6
 if "used_generic_qs" not in st.session_state:
     st.session_state.used_generic_qs = set()
+if "prefetch" not in st.session_state:
+    st.session_state.prefetch = {}
+
+# a reconnect or a restart picks the game back up from its id in the URL without touching the LLM; other replicas
+# only see it if they share the GAME_STATE_PATH database
+if st.session_state.player_name is None and st.query_params.get("game"):
+    if not restore_game(st.query_params["game"]):
+        del st.query_params["game"]
 
 st.title("🎭 Guess the Celebrity")
 
@@ -371,23 +649,28 @@ if st.session_state.player_name is None:
             st.session_state.player_name = name.strip()
             st.session_state.selected_industries = industries
             st.session_state.difficulty = difficulty
-            st.session_state.celebrity_rounds = generate_random_celebrities(industries, difficulty)
+            st.session_state.celebrity_rounds = generate_random_celebrities(industries, difficulty, name.strip())
+            st.session_state.prefetch = start_round_prefetch(st.session_state.celebrity_rounds, st.session_state.used_generic_qs)
             st.session_state.all_scores[name] = 0
             upsert_score(name, 0)
+            st.session_state.game_id = game_state.new_game_id()
+            st.query_params["game"] = st.session_state.game_id
+            save_game()
             st.rerun()
     except Exception:
         st.error("Unable to start. Try again.")
 else:
     try:
+        if get_llm().degraded():
+            st.warning("Degraded mode: the AI is slow or unavailable, so intros, questions and guess checks come from local fallbacks for now.")
         left, right = st.columns([1.15, 3.0])
         with left:
             ok = supabase_realtime_leaderboard_widget()
             if not ok:
-                df_lb = fetch_leaderboard_df()
+                rows = fetch_leaderboard_rows()
                 st.subheader("🏆 Leaderboard")
-                if not df_lb.empty:
-                    df_show = df_lb.rename(columns={"player":"Player","score":"Score"})
-                    st.dataframe(df_show, use_container_width=True, height=420)
+                if rows:
+                    st.dataframe(rows, use_container_width=True, height=420)
                 else:
                     st.info("No scores yet")
         with right:
@@ -406,6 +689,7 @@ else:
                 st.write("All rounds attempted. Watch the leaderboard on the left.")
             else:
                 tabs = st.tabs([f"Round {i+1}" for i in range(6)])
+                first_open = True
                 for i in range(6):
                     with tabs[i]:
                         if i >= len(st.session_state.celebrity_rounds):
@@ -422,11 +706,19 @@ else:
                             continue
 
                         key_intro = f"intro_{i}"
+                        qkey = f"qset_{i}"
+                        # the first playable round blocks on its own prefetch, the rest fill in on later reruns
+                        ready_intro = collect_prefetched(key_intro, wait=first_open)
+                        ready_qs = collect_prefetched(qkey, wait=first_open)
+                        first_open = False
+                        if not (ready_intro and ready_qs) and (key_intro in st.session_state.prefetch or qkey in st.session_state.prefetch):
+                            st.info("Preparing this round...")
+                            continue
+                        intro_box = st.empty()
                         if key_intro not in st.session_state:
-                            st.session_state[key_intro] = generate_intro(celeb)
-                        st.info(st.session_state[key_intro])
+                            st.session_state[key_intro] = generate_intro(celeb, on_text=intro_box.info)
+                        intro_box.info(st.session_state[key_intro])
 
-                        qkey = f"qset_{i}"
                         if qkey not in st.session_state:
                             st.session_state[qkey] = generate_generic_questions(st.session_state.used_generic_qs)
                         qs = st.session_state.get(qkey, [])
@@ -448,9 +740,16 @@ else:
 
                         user_prompt = st.text_area("Your message", key=f"prompt_{i}")
                         if st.button("Ask", key=f"ask_{i}") and user_prompt:
-                            reply = generate_response(celeb, user_prompt)
                             st.success("Celebrity says")
-                            st.markdown(reply)
+                            reply_box = st.empty()
+                            ckey = f"conv_{i}"
+                            if ckey not in st.session_state:
+                                st.session_state[ckey] = new_conversation()
+                            memory = st.session_state[ckey]
+                            reply = generate_response(celeb, user_prompt, on_text=reply_box.markdown, memory=memory)
+                            reply_box.markdown(reply)
+                            if memory.prompt_tokens:
+                                st.caption(f"Prompt size: ~{memory.prompt_tokens[-1]} tokens")
                             st.session_state.used_generic_qs.update(qs)
                             st.session_state[qkey] = generate_generic_questions(st.session_state.used_generic_qs)
 
@@ -463,17 +762,16 @@ else:
                         guess = st.text_input("Your guess", key=f"guess_{i}")
                         if st.button("Submit Guess", key=f"guess_btn_{i}") and guess:
                             st.session_state.guess_counts[i] += 1
-                            okg = check_guess_llm(guess, celeb)
+                            okg = check_guess(guess, celeb)
                             if okg:
                                 st.success(f"Correct. It was {celeb}.")
                                 st.session_state.guessed[i] = True
                                 pts = select_difficulty_params(st.session_state.difficulty)["points"]
-                                current = get_player_score_from_db(st.session_state.player_name)
-                                new_score = current + pts
-                                upsert_score(st.session_state.player_name, new_score)
+                                upsert_score(st.session_state.player_name, pts)
                                 try:
-                                    line = generate_congrats_line_named(celeb)
-                                    st.markdown(f"**{line}**")
+                                    line_box = st.empty()
+                                    line = generate_congrats_line_named(celeb, on_text=lambda t: line_box.markdown(f"**{t}**"))
+                                    line_box.markdown(f"**{line}**")
                                 except Exception:
                                     st.markdown(f"**Well done. I am {celeb}.**")
                             else:
@@ -483,6 +781,9 @@ else:
                                 else:
                                     st.error("Not quite. Try again")
 
+                if st.session_state.prefetch:
+                    get_autorefresh()(interval=700, key="prefetch_refresh")
+
             all_attempted = all(g or l for g, l in zip(st.session_state.guessed, st.session_state.locked))
             if all_attempted:
                 st.balloons()
@@ -490,9 +791,20 @@ else:
                 st.subheader("You have attempted all rounds")
                 st.write(f"Final Score: {live_score} of 6 rounds")
                 if st.button("Play Again"):
-                    for key in ['player_name','selected_industries','celebrity_rounds','guessed','locked','difficulty','guess_counts','used_generic_qs']:
+                    if st.session_state.get("game_id"):
+                        get_game_store().delete(st.session_state.game_id)
+                    st.query_params.pop("game", None)
+                    for key in ['player_name','selected_industries','celebrity_rounds','guessed','locked','difficulty','guess_counts','used_generic_qs','prefetch','game_id']:
                         st.session_state.pop(key, None)
+                    for i in range(6):
+                        for key in [f"intro_{i}", f"qset_{i}", f"conv_{i}"]:
+                            st.session_state.pop(key, None)
                     st.rerun()
     except Exception:
         st.error("Unexpected error. Try again.")
 
+save_game()
+
+rerun_total, rerun_trace = metrics.end_rerun()
+if os.environ.get("DEBUG_TIMINGS") == "1" or st.query_params.get("debug") == "1":
+    render_debug_sidebar(rerun_total, rerun_trace)
@@ -0,0 +1,194 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def new_game_id():
+    return secrets.token_urlsafe(9)
+
+def snapshot(record):
+    # records hold lists the session keeps mutating in place; the cache and callers each get their own copy
+    return json.loads(json.dumps(record))
+
+class SQLiteGameBackend:
+    # one row per (game, field), so a rerun that changed one guess count rewrites one small row
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS game_fields ("
+                "game_id TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (game_id, field))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS game_fields_updated_idx ON game_fields (updated)")
+            # bumped on every write, so a process holding a cached copy can tell another one has moved the game on
+            self.conn.execute("CREATE TABLE IF NOT EXISTS games (game_id TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def version(self, game_id):
+        with self.lock:
+            row = self.conn.execute("SELECT version FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, game_id):
+        with self.lock:
+            rows = self.conn.execute("SELECT field, value FROM game_fields WHERE game_id = ?", (game_id,)).fetchall()
+            row = self.conn.execute("SELECT version FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if not rows:
+            return None, 0
+        return {field: json.loads(value) for field, value in rows}, row[0] if row else 0
+
+    def write(self, game_id, changed, removed=()):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO game_fields (game_id, field, value, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(game_id, field) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+                [(game_id, field, json.dumps(value, separators=(",", ":")), now) for field, value in changed.items()],
+            )
+            self.conn.executemany("DELETE FROM game_fields WHERE game_id = ? AND field = ?",
+                                  [(game_id, field) for field in removed])
+            # keep every field's timestamp fresh so purge never drops half a game
+            self.conn.execute("UPDATE game_fields SET updated = ? WHERE game_id = ?", (now, game_id))
+            return self.conn.execute(
+                "INSERT INTO games (game_id, version) VALUES (?, 1) "
+                "ON CONFLICT(game_id) DO UPDATE SET version = version + 1 RETURNING version",
+                (game_id,),
+            ).fetchone()[0]
+
+    def delete(self, game_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM game_fields WHERE game_id = ?", (game_id,))
+            self.conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+    def purge(self, older_than):
+        with self.lock, self.conn:
+            n = self.conn.execute("DELETE FROM game_fields WHERE updated < ?", (older_than,)).rowcount
+            self.conn.execute("DELETE FROM games WHERE game_id NOT IN (SELECT game_id FROM game_fields)")
+            return n
+
+class MemoryGameBackend:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.games = {}
+
+    def version(self, game_id):
+        with self.lock:
+            game = self.games.get(game_id)
+            return game[2] if game else 0
+
+    def load(self, game_id):
+        with self.lock:
+            game = self.games.get(game_id)
+            return (json.loads(game[0]), game[2]) if game else (None, 0)
+
+    def write(self, game_id, changed, removed=()):
+        with self.lock:
+            game = self.games.get(game_id)
+            record = json.loads(game[0]) if game else {}
+            record.update(changed)
+            for field in removed:
+                record.pop(field, None)
+            version = (game[2] if game else 0) + 1
+            self.games[game_id] = (json.dumps(record, separators=(",", ":")), time.time(), version)
+            return version
+
+    def delete(self, game_id):
+        with self.lock:
+            self.games.pop(game_id, None)
+
+    def purge(self, older_than):
+        with self.lock:
+            stale = [g for g, (_, updated, _) in self.games.items() if updated < older_than]
+            for g in stale:
+                del self.games[g]
+        return len(stale)
+
+class GameStore:
+    def __init__(self, backend, maxsize=2000, idle_ttl=1800, retention=7 * 86400, purge_interval=600):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.lock = threading.Lock()
+        self.games = OrderedDict()
+        self.last_purge = 0.0
+        self.stats = {"loads": 0, "restores": 0, "misses": 0, "stale": 0, "writes": 0, "fields_written": 0,
+                      "evictions": 0}
+
+    def _evict(self, now):
+        # the LRU front is the longest idle; a game only leaves memory, the backend still has it
+        while self.games:
+            game_id, (_, touched, _) = next(iter(self.games.items()))
+            if len(self.games) <= self.maxsize and now - touched < self.idle_ttl:
+                break
+            del self.games[game_id]
+            self.stats["evictions"] += 1
+
+    def _touch(self, game_id, record, version, now):
+        self.games[game_id] = (record, now, version)
+        self.games.move_to_end(game_id)
+        self._evict(now)
+
+    def load(self, game_id):
+        if not game_id:
+            return None
+        now = time.time()
+        with self.lock:
+            self.stats["loads"] += 1
+            hit = self.games.get(game_id)
+        # the cached copy only stands while nobody else has written the game since, e.g. another process on a
+        # shared database; the version check is one indexed read, a full reload only happens when it moved on
+        if hit is not None:
+            if self.backend.version(game_id) == hit[2]:
+                with self.lock:
+                    self._touch(game_id, hit[0], hit[2], now)
+                return snapshot(hit[0])
+            with self.lock:
+                self.stats["stale"] += 1
+        record, version = self.backend.load(game_id)
+        with self.lock:
+            if record is None:
+                self.games.pop(game_id, None)
+                self.stats["misses"] += 1
+                return None
+            self.stats["restores"] += 1
+            self._touch(game_id, record, version, now)
+        return snapshot(record)
+
+    def save(self, game_id, record):
+        record = snapshot(record)
+        now = time.time()
+        current = self.backend.version(game_id)
+        with self.lock:
+            hit = self.games.get(game_id)
+            # diff against the cached copy only if it is still what the backend holds, otherwise write everything
+            old = hit[0] if hit is not None and hit[2] == current else {}
+            changed = {k: v for k, v in record.items() if old.get(k) != v}
+            removed = [k for k in old if k not in record]
+            if changed or removed:
+                self.stats["writes"] += 1
+                self.stats["fields_written"] += len(changed)
+            purge = now - self.last_purge >= self.purge_interval
+            if purge:
+                self.last_purge = now
+        version = self.backend.write(game_id, changed, removed) if changed or removed else current
+        with self.lock:
+            self._touch(game_id, record, version, now)
+        if purge:
+            self.backend.purge(now - self.retention)
+        return len(changed)
+
+    def delete(self, game_id):
+        with self.lock:
+            self.games.pop(game_id, None)
+        self.backend.delete(game_id)
+
+    def get_stats(self):
+        with self.lock:
+            out = dict(self.stats)
+            out["in_memory"] = len(self.games)
+        return out
@@ -0,0 +1,209 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+ACCEPT_SCORE = 0.95
+REJECT_SCORE = 0.62
+PARTIAL_SCORE = 0.9
+MEMO_SIZE = 20000
+
+KNOWN_ALIASES = {
+    "shah rukh khan": ["srk", "shahrukh", "king khan"],
+    "leonardo dicaprio": ["leo", "leo dicaprio"],
+    "mammootty": ["mammukka", "mamooty", "mammooty"],
+    "scarlett johansson": ["scarjo"],
+    "fahadh faasil": ["fafa", "fahad fasil"],
+}
+
+_lock = threading.Lock()
+_memo = OrderedDict()
+_alias_index = {}
+stats = {"local_yes": 0, "local_no": 0, "memo_hits": 0, "llm": 0, "relaxed": 0}
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    return " ".join(text.split())
+
+def damerau_levenshtein(a, b):
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if not la or not lb:
+        return la or lb
+    prev2 = None
+    prev = list(range(lb + 1))
+    for i in range(1, la + 1):
+        cur = [i] + [0] * lb
+        for j in range(1, lb + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[lb]
+
+def jaro_winkler(a, b):
+    if a == b:
+        return 1.0
+    la, lb = len(a), len(b)
+    if not la or not lb:
+        return 0.0
+    window = max(max(la, lb) // 2 - 1, 0)
+    a_hit = [False] * la
+    b_hit = [False] * lb
+    matches = 0
+    for i in range(la):
+        for j in range(max(0, i - window), min(lb, i + window + 1)):
+            if not b_hit[j] and a[i] == b[j]:
+                a_hit[i] = b_hit[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    t = 0
+    j = 0
+    for i in range(la):
+        if a_hit[i]:
+            while not b_hit[j]:
+                j += 1
+            if a[i] != b[j]:
+                t += 1
+            j += 1
+    jaro = (matches / la + matches / lb + (matches - t / 2) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+def build_aliases(actual_name):
+    key = normalize(actual_name)
+    with _lock:
+        cached = _alias_index.get(key)
+    if cached is not None:
+        return cached
+    tokens = key.split()
+    # alias -> partial; a partial alias is one word of a longer name, e.g. a surname that many celebrities share
+    aliases = {key: False, key.replace(" ", ""): False}
+    if len(tokens) > 2:
+        # "srk" is distinctive; two letters ("th") fit too many celebrities to accept without the model
+        aliases.setdefault("".join(t[0] for t in tokens), False)
+    if len(tokens) > 1:
+        # consecutive token runs cover "shah rukh" / "rukh khan"; single tokens only if distinctive
+        for i in range(len(tokens)):
+            for j in range(i + 1, len(tokens) + 1):
+                run = tokens[i:j]
+                if len(run) == 1 and len(run[0]) < 4:
+                    continue
+                aliases.setdefault(" ".join(run), len(run) == 1)
+                aliases.setdefault("".join(run), len(run) == 1)
+    for extra in KNOWN_ALIASES.get(key, []):
+        aliases[normalize(extra)] = False
+    aliases = {a: partial for a, partial in aliases.items() if a}
+    with _lock:
+        _alias_index[key] = aliases
+    return aliases
+
+def register_aliases(actual_name, aliases):
+    key = normalize(actual_name)
+    with _lock:
+        KNOWN_ALIASES.setdefault(key, [])
+        KNOWN_ALIASES[key].extend(aliases)
+        _alias_index.pop(key, None)
+
+def similarity(guess, actual_name):
+    g = normalize(guess)
+    if not g:
+        return 0.0
+    best = 0.0
+    for alias, partial in build_aliases(actual_name).items():
+        if g == alias:
+            score = 1.0
+        else:
+            score = jaro_winkler(g, alias)
+            # one slip inside a multi-word name is a typo; between two single words it is often someone else (kajol, kajal)
+            if len(g) >= 5 and len(alias) >= 5 and damerau_levenshtein(g, alias) <= 1:
+                score = max(score, 0.97 if " " in g and " " in alias else PARTIAL_SCORE)
+        if partial:
+            score = min(score, PARTIAL_SCORE)
+        best = max(best, score)
+    return best
+
+def looks_like_full_name(g):
+    # a local "no" is only safe when the guess reads as somebody else's full name; one-word guesses and phrases
+    # like "big b" or "the rock" may be nicknames this module has never heard of
+    parts = g.split()
+    return len(parts) >= 2 and all(len(p) >= 2 for p in parts) and parts[0] not in ("the", "mr", "mrs", "miss", "dr")
+
+def local_verdict(guess, actual_name, accept=ACCEPT_SCORE, reject=REJECT_SCORE):
+    g = normalize(guess)
+    if not g:
+        return False
+    score = similarity(g, actual_name)
+    if score >= accept:
+        return True
+    tokens = set(normalize(actual_name).split())
+    if score < reject and looks_like_full_name(g) and not tokens.intersection(g.split()):
+        return False
+    return None
+
+def relaxed_verdict(guess, actual_name):
+    # without the model, only a one-character slip in a long full-name alias is accepted; a shared first name
+    # with a similar surname (tom hanks, tom hardy) is usually a different person
+    g = normalize(guess)
+    if len(g) < 5:
+        return False
+    return any(not partial and len(alias) >= 8 and damerau_levenshtein(g, alias) <= 1
+               for alias, partial in build_aliases(actual_name).items())
+
+def memo_get(guess, actual_name):
+    key = (normalize(guess), normalize(actual_name))
+    with _lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            stats["memo_hits"] += 1
+            return _memo[key]
+    return None
+
+def memo_put(guess, actual_name, verdict):
+    key = (normalize(guess), normalize(actual_name))
+    with _lock:
+        _memo[key] = bool(verdict)
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+
+def match_guess(guess, actual_name, fallback):
+    cached = memo_get(guess, actual_name)
+    if cached is not None:
+        return cached
+    verdict = local_verdict(guess, actual_name)
+    if verdict is not None:
+        with _lock:
+            stats["local_yes" if verdict else "local_no"] += 1
+        # a local "no" rests only on low similarity, so it is cheap to recompute and not worth pinning
+        if verdict:
+            memo_put(guess, actual_name, verdict)
+        return verdict
+    with _lock:
+        stats["llm"] += 1
+    verdict = fallback(guess, actual_name)
+    if verdict is None:
+        # the model is unavailable, so settle the grey zone locally; not memoized so it gets a proper verdict later
+        with _lock:
+            stats["relaxed"] += 1
+        return relaxed_verdict(guess, actual_name)
+    memo_put(guess, actual_name, verdict)
+    return verdict
+
+def get_stats():
+    with _lock:
+        out = dict(stats)
+        out["memo_size"] = len(_memo)
+    decided = out["local_yes"] + out["local_no"] + out["llm"]
+    out["local_ratio"] = (out["local_yes"] + out["local_no"]) / decided if decided else 0.0
+    return out
@@ -0,0 +1,354 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window=20, min_calls=5, error_rate=0.5, latency_p95=None, cooldown=15.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_p95 = latency_p95
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probe = None
+        self.probes = 0
+        self.probe_started = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        # returns the probe token when this call is the half-open probe, None for an ordinary call
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self.probe = None
+            if self.state == self.CLOSED:
+                return None
+            # half-open lets a single probe through; everything else fails fast until it reports back,
+            # and a probe that never reports (abandoned stream) is replaced after another cooldown
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and (self.probe is None or now - self.probe_started >= self.cooldown):
+                self.probes += 1
+                self.probe = self.probes
+                self.probe_started = now
+                return self.probe
+            self.rejected += 1
+        raise CircuitOpenError("LLM circuit is open")
+
+    def record(self, ok, seconds, token=None):
+        with self.lock:
+            if self.state != self.CLOSED:
+                # only the current probe decides; calls admitted before the trip, or a replaced probe, finish unheard
+                if self.state == self.HALF_OPEN and token is not None and token == self.probe:
+                    self.probe = None
+                    if ok and not self._slow(seconds):
+                        self.state = self.CLOSED
+                        self.outcomes.clear()
+                    else:
+                        self._trip()
+                return
+            self.outcomes.append((ok, seconds))
+            if self._unhealthy():
+                self._trip()
+
+    def _slow(self, seconds):
+        return self.latency_p95 is not None and seconds is not None and seconds > self.latency_p95
+
+    def _unhealthy(self):
+        if len(self.outcomes) < self.min_calls:
+            return False
+        failures = sum(1 for ok, _ in self.outcomes if not ok)
+        if failures / len(self.outcomes) >= self.error_rate:
+            return True
+        if self.latency_p95 is None:
+            return False
+        # outcomes without a latency (long batch generations) count towards the error rate only
+        latencies = sorted(s for _, s in self.outcomes if s is not None)
+        if len(latencies) < self.min_calls:
+            return False
+        return latencies[int(0.95 * (len(latencies) - 1))] > self.latency_p95
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.trips += 1
+
+    def is_open(self):
+        with self.lock:
+            return self.state != self.CLOSED
+
+    def get_stats(self):
+        with self.lock:
+            return {"circuit_open": int(self.state != self.CLOSED), "circuit_trips": self.trips,
+                    "circuit_rejected": self.rejected}
+
+def pooled_session():
+    import requests
+
+    class PooledSession(requests.Session):
+        # openai closes its per-thread session every few minutes; this one is shared, so closing would drop
+        # the whole process's connection pool out from under the other threads
+        def close(self):
+            pass
+
+    return PooledSession()
+
+class OpenAIBackend:
+    def __init__(self, api_key, api_base=None, pool_size=32, verify=True):
+        import openai
+        from requests.adapters import HTTPAdapter
+        self.openai = openai
+        self.api_key = api_key
+        self.api_base = api_base
+        self.session = pooled_session()
+        self.session.verify = verify
+        if not verify:
+            import urllib3
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        openai.requestssession = self.session
+
+    def _create(self, model, messages, temperature, timeout, stream):
+        kwargs = {"model": model, "messages": messages, "temperature": temperature,
+                  "request_timeout": timeout, "api_key": self.api_key, "stream": stream}
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+        return self.openai.ChatCompletion.create(**kwargs)
+
+    def complete(self, model, messages, temperature, timeout):
+        r = self._create(model, messages, temperature, timeout, False)
+        return r.choices[0].message.content, dict(r.get("usage") or {})
+
+    def stream(self, model, messages, temperature, timeout):
+        for chunk in self._create(model, messages, temperature, timeout, True):
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+    def retryable(self, exc):
+        err = self.openai.error
+        return isinstance(exc, (err.RateLimitError, err.APIConnectionError, err.Timeout,
+                                err.ServiceUnavailableError, err.TryAgain, err.APIError))
+
+class FakeBackend:
+    def __init__(self, responder=None, latency=0.0, tokens_per_sec=None):
+        self.responder = responder or self.default_responder
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+
+    @staticmethod
+    def default_responder(model, messages, temperature):
+        if "JSON" in messages[0]["content"]:
+            return json.dumps([])
+        if "yes or no" in messages[0]["content"]:
+            return "no"
+        return "I would rather keep a little mystery about that."
+
+    def _tokens(self, text):
+        return text.split(" ")
+
+    def complete(self, model, messages, temperature, timeout):
+        text = self.responder(model, messages, temperature)
+        delay = self.latency
+        if self.tokens_per_sec:
+            delay += len(self._tokens(text)) / self.tokens_per_sec
+        time.sleep(min(delay, timeout) if timeout else delay)
+        if timeout and delay > timeout:
+            raise TimeoutError("fake backend timed out")
+        prompt_tokens = sum(len(m["content"]) // 4 for m in messages)
+        completion_tokens = len(self._tokens(text))
+        return text, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+
+    def stream(self, model, messages, temperature, timeout):
+        text = self.responder(model, messages, temperature)
+        time.sleep(self.latency)
+        step = 1.0 / self.tokens_per_sec if self.tokens_per_sec else 0
+        words = self._tokens(text)
+        for i, word in enumerate(words):
+            if step:
+                time.sleep(step)
+            yield word if i == len(words) - 1 else word + " "
+
+    def retryable(self, exc):
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+class LLMClient:
+    def __init__(self, backend, model, timeout=20.0, max_retries=3, backoff=0.5, max_backoff=8.0,
+                 max_concurrency=16, rate_per_sec=None, burst=None, on_usage=None, breaker=None):
+        self.backend = backend
+        self.breaker = breaker
+        self.on_usage = on_usage
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(rate_per_sec, burst) if rate_per_sec else None
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _count(self, **deltas):
+        with self.lock:
+            for k, v in deltas.items():
+                self.stats[k] = self.stats.get(k, 0) + v
+
+    def _admit(self, timeout):
+        if self.bucket and not self.bucket.acquire(timeout):
+            raise TimeoutError("LLM rate limit wait exceeded")
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError("LLM concurrency wait exceeded")
+
+    def _start_attempt(self, timeout):
+        # an open breaker fails before queueing for a slot, so callers reach their fallback immediately
+        token = self.breaker.allow() if self.breaker else None
+        t0 = time.monotonic()
+        try:
+            self._admit(timeout)
+        except Exception:
+            self._record(False, time.monotonic() - t0, token)
+            raise
+        return t0, token
+
+    def _record(self, ok, seconds, token):
+        if self.breaker:
+            self.breaker.record(ok, seconds, token)
+
+    def degraded(self):
+        return self.breaker is not None and self.breaker.is_open()
+
+    def transient(self, exc):
+        # failures the retry loop already handled: waits, timeouts, rate limits and an open circuit
+        return isinstance(exc, (CircuitOpenError, TimeoutError)) or self.backend.retryable(exc)
+
+    def _sleep_backoff(self, attempt):
+        # full jitter keeps retries from many sessions from lining up into another 429 burst
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def complete(self, messages, temperature=0.7, model=None, timeout=None, judge_latency=True):
+        model = model or self.model
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            t0, token = self._start_attempt(timeout)
+            try:
+                self._count(calls=1)
+                text, usage = self.backend.complete(model, messages, temperature, timeout)
+            except Exception as e:
+                self._record(False, time.monotonic() - t0 if judge_latency else None, token)
+                if attempt >= self.max_retries or not self.backend.retryable(e):
+                    self._count(errors=1)
+                    raise
+                attempt += 1
+                self._count(retries=1)
+            else:
+                self._record(True, time.monotonic() - t0 if judge_latency else None, token)
+                self._count(prompt_tokens=int(usage.get("prompt_tokens", 0) or 0),
+                            completion_tokens=int(usage.get("completion_tokens", 0) or 0))
+                if self.on_usage:
+                    self.on_usage(model, usage)
+                return (text or "").strip()
+            finally:
+                self.slots.release()
+            self._sleep_backoff(attempt)
+
+    def stream(self, messages, temperature=0.7, model=None, timeout=None):
+        model = model or self.model
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            t0, token = self._start_attempt(timeout)
+            started = False
+            try:
+                self._count(calls=1)
+                for delta in self.backend.stream(model, messages, temperature, timeout):
+                    if not started:
+                        # a stream is judged on time to first token; later breakage is the caller's partial answer
+                        started = True
+                        self._record(True, time.monotonic() - t0, token)
+                    yield delta
+                if not started:
+                    self._record(True, time.monotonic() - t0, token)
+                return
+            except Exception as e:
+                if not started:
+                    self._record(False, time.monotonic() - t0, token)
+                # only retry before the first token; a half-written answer cannot be replayed
+                if started or attempt >= self.max_retries or not self.backend.retryable(e):
+                    self._count(errors=1)
+                    raise
+                attempt += 1
+                self._count(retries=1)
+            finally:
+                self.slots.release()
+            self._sleep_backoff(attempt)
+
+    def complete_json(self, prompt, temperature=0.6, model=None, timeout=None):
+        # JSON calls are the long batch and refill generations; a healthy one can take as long as the p95 limit
+        txt = self.complete([{"role": "system", "content": "Reply only with valid JSON."},
+                             {"role": "user", "content": prompt}], temperature, model, timeout, judge_latency=False)
+        return parse_json(txt)
+
+    async def acomplete(self, messages, temperature=0.7, model=None, timeout=None):
+        return await asyncio.to_thread(self.complete, messages, temperature, model, timeout)
+
+    async def acomplete_json(self, prompt, temperature=0.6, model=None, timeout=None):
+        return await asyncio.to_thread(self.complete_json, prompt, temperature, model, timeout)
+
+    def get_stats(self):
+        with self.lock:
+            out = dict(self.stats)
+        if self.breaker:
+            out.update(self.breaker.get_stats())
+        return out
+
+def parse_json(txt):
+    try:
+        return json.loads(txt)
+    except Exception:
+        s = txt.strip().strip("`").strip()
+        if s.startswith("json"):
+            s = s[4:].strip()
+        starts = [i for i in (s.find("["), s.find("{")) if i >= 0]
+        if starts:
+            start = min(starts)
+            s = s[start: s.rfind("]" if s[start] == "[" else "}")+1]
+        return json.loads(s)
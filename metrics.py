@@ -0,0 +1,170 @@
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_collectors = {}
+_local = threading.local()
+
+def _key(name, labels):
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                h["buckets"][i] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+def fallback(function):
+    inc("app_fallbacks_total", function=function)
+
+def register_collector(name, fn):
+    with _lock:
+        _collectors[name] = fn
+
+def current_function():
+    # tokens are charged to the outermost instrumented call, e.g. generate_round_content rather than llm_json
+    stack = getattr(_local, "stack", None)
+    return stack[0] if stack else None
+
+def record_usage(model, usage):
+    function = current_function()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        n = int((usage or {}).get(kind, 0) or 0)
+        if n:
+            inc("app_llm_tokens_total", n, function=function, model=model, kind=kind.split("_")[0])
+
+def timed(model=None):
+    def wrap(fn):
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            stack = getattr(_local, "stack", None)
+            if stack is None:
+                stack = _local.stack = []
+            stack.append(name)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                inc("app_errors_total", function=name, model=model)
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                stack.pop()
+                observe("app_call_latency_seconds", elapsed, function=name, model=model)
+                trace = getattr(_local, "trace", None)
+                # nested instrumented calls show up in the trace but only the outermost counts towards the total
+                if trace is not None:
+                    trace.append({"function": name, "seconds": elapsed, "depth": len(stack)})
+        return inner
+    return wrap
+
+def begin_rerun():
+    _local.trace = []
+    _local.rerun_start = time.perf_counter()
+    return _local.trace
+
+def end_rerun():
+    trace = getattr(_local, "trace", None) or []
+    start = getattr(_local, "rerun_start", None)
+    total = time.perf_counter() - start if start is not None else 0.0
+    observe("app_rerun_seconds", total)
+    _local.trace = None
+    return total, trace
+
+def _collected():
+    with _lock:
+        collectors = list(_collectors.items())
+    out = {}
+    for name, fn in collectors:
+        try:
+            values = fn() or {}
+        except Exception:
+            continue
+        for k, v in values.items():
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                out[f"app_{name}_{k}"] = v
+    return out
+
+def snapshot():
+    with _lock:
+        counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in _counters.items()]
+        histograms = [{"name": n, "labels": dict(l), "buckets": dict(zip(map(str, BUCKETS), h["buckets"])),
+                       "sum": h["sum"], "count": h["count"]} for (n, l), h in _histograms.items()]
+    return {"counters": counters, "histograms": histograms, "gauges": _collected()}
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+def _fmt_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+def to_prometheus():
+    snap = snapshot()
+    lines = []
+    seen = set()
+    for c in sorted(snap["counters"], key=lambda c: c["name"]):
+        if c["name"] not in seen:
+            lines.append(f"# TYPE {c['name']} counter")
+            seen.add(c["name"])
+        lines.append(f"{c['name']}{_fmt_labels(c['labels'])} {c['value']}")
+    for h in sorted(snap["histograms"], key=lambda h: h["name"]):
+        name = h["name"]
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        for bound, count in h["buckets"].items():
+            lines.append(f"{name}_bucket{_fmt_labels(h['labels'], {'le': bound})} {count}")
+        lines.append(f"{name}_bucket{_fmt_labels(h['labels'], {'le': '+Inf'})} {h['count']}")
+        lines.append(f"{name}_sum{_fmt_labels(h['labels'])} {h['sum']}")
+        lines.append(f"{name}_count{_fmt_labels(h['labels'])} {h['count']}")
+    for name, value in sorted(snap["gauges"].items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = to_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = to_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_http_server(port, host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,105 @@
+import json
+import os
+import random
+import threading
+import time
+
+from guess_matcher import normalize
+
+class QuestionBank:
+    def __init__(self, path="question_bank.json", seed=(), refill=None, target_size=200, refresh_interval=30.0):
+        self.path = path
+        self.refill = refill
+        self.target_size = target_size
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.last_refresh = None
+        self.questions = []
+        self.keys = set()
+        self._extend(seed)
+        self._extend(self._load())
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except Exception:
+            return []
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.questions, f, ensure_ascii=False, indent=0)
+        os.replace(tmp, self.path)
+
+    def _extend(self, questions):
+        added = 0
+        for q in questions:
+            if not isinstance(q, str) or not q.strip():
+                continue
+            key = normalize(q)
+            if key and key not in self.keys:
+                self.keys.add(key)
+                self.questions.append(q.strip())
+                added += 1
+        return added
+
+    def add(self, questions):
+        with self.lock:
+            added = self._extend(questions)
+            if added:
+                self._save()
+        return added
+
+    def draw(self, used, k=3):
+        with self.lock:
+            questions = self.questions
+            n = len(questions)
+        out = []
+        picked = set()
+        # random probes with set lookups; a bounded scan covers the case where most of the bank is used up
+        for _ in range(k * 8):
+            if len(out) == k or not n:
+                break
+            q = questions[random.randrange(n)]
+            if q not in used and q not in picked:
+                out.append(q)
+                picked.add(q)
+        if len(out) < k and n:
+            start = random.randrange(n)
+            for j in range(n):
+                q = questions[(start + j) % n]
+                if q not in used and q not in picked:
+                    out.append(q)
+                    picked.add(q)
+                    if len(out) == k:
+                        break
+        return out
+
+    def size(self):
+        with self.lock:
+            return len(self.questions)
+
+    def refresh_async(self):
+        if not self.refill:
+            return False
+        with self.lock:
+            if self.refreshing or len(self.questions) >= self.target_size:
+                return False
+            if self.last_refresh is not None and time.monotonic() - self.last_refresh < self.refresh_interval:
+                return False
+            self.refreshing = True
+            self.last_refresh = time.monotonic()
+        threading.Thread(target=self._refresh, name="question-bank-refresh", daemon=True).start()
+        return True
+
+    def _refresh(self):
+        try:
+            self.add(self.refill() or [])
+        except Exception:
+            pass
+        finally:
+            with self.lock:
+                self.refreshing = False
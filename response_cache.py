@@ -0,0 +1,98 @@
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from guess_matcher import normalize
+
+def estimate_tokens(text):
+    return max(1, len(text or "") // 4)
+
+class ResponseCache:
+    def __init__(self, maxsize=5000, ttl=7 * 86400, variants=3, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.variants = variants
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "saved_tokens": 0, "evictions": 0}
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            with self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "celebrity TEXT NOT NULL, prompt TEXT NOT NULL, text TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS responses_key_idx ON responses (celebrity, prompt)")
+            self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        with self.conn:
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+        rows = self.conn.execute(
+            "SELECT celebrity, prompt, text, created FROM responses ORDER BY created DESC LIMIT ?",
+            (self.maxsize * self.variants,),
+        ).fetchall()
+        for celeb, prompt, text, created in reversed(rows):
+            self._add((celeb, prompt), text, created)
+
+    def key(self, celebrity, prompt, namespace=None):
+        # normalize() strips "#" from every real prompt, so namespaced entries such as intros cannot collide with one
+        return (normalize(celebrity), f"#{namespace}" if namespace else normalize(prompt))
+
+    def _add(self, key, text, created):
+        variants = self.entries.setdefault(key, [])
+        variants.append((text, created))
+        del variants[:-self.variants]
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, celebrity, prompt, prompt_tokens=0, namespace=None, min_variants=None):
+        key = self.key(celebrity, prompt, namespace)
+        now = time.time()
+        with self.lock:
+            variants = [v for v in self.entries.get(key, []) if now - v[1] < self.ttl]
+            # only answer from cache once k distinct takes exist, so repeat askers still see some variety
+            if not variants or len(variants) < (min_variants or self.variants):
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            text = random.choice(variants)[0]
+            self.stats["hits"] += 1
+            self.stats["saved_tokens"] += prompt_tokens + estimate_tokens(text)
+            return text
+
+    def put(self, celebrity, prompt, text, namespace=None):
+        if not text:
+            return
+        key = self.key(celebrity, prompt, namespace)
+        now = time.time()
+        with self.lock:
+            self._add(key, text, now)
+            if self.conn:
+                try:
+                    with self.conn:
+                        self.conn.execute(
+                            "INSERT INTO responses (celebrity, prompt, text, created) VALUES (?, ?, ?, ?)",
+                            (key[0], key[1], text, now),
+                        )
+                        self.conn.execute(
+                            "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses "
+                            "WHERE celebrity = ? AND prompt = ? ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                            (key[0], key[1], self.variants),
+                        )
+                except Exception:
+                    pass
+
+    def get_stats(self):
+        with self.lock:
+            out = dict(self.stats)
+            out["size"] = len(self.entries)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / lookups if lookups else 0.0
+        return out
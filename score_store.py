@@ -0,0 +1,190 @@
+import atexit
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+def player_key(player):
+    return re.sub(r"\s+", " ", str(player or "").strip().lower())
+
+class SupabaseScoreStore:
+    def __init__(self, client):
+        self.client = client
+
+    def increment(self, player, points):
+        data = self.client.rpc("increment_score", {"p_player": player.strip(), "p_points": int(points)}).execute().data
+        return int(data or 0)
+
+    def increment_many(self, deltas):
+        rows = [{"player": player.strip(), "points": int(points)} for player, points in deltas.items()]
+        if rows:
+            self.client.rpc("increment_scores", {"p_rows": rows}).execute()
+
+    def get(self, player):
+        data = self.client.rpc("player_score", {"p_player": player}).execute().data
+        return int(data or 0)
+
+    def top(self, limit=100):
+        data = self.client.table("leaderboard").select("player,score").order("score", desc=True).limit(limit).execute().data
+        return data or []
+
+class SQLiteScoreStore:
+    def __init__(self, path=":memory:"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS leaderboard ("
+                "player_key TEXT PRIMARY KEY, player TEXT NOT NULL, "
+                "score INTEGER NOT NULL DEFAULT 0, updated_at TEXT)"
+            )
+
+    def increment(self, player, points):
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "INSERT INTO leaderboard (player_key, player, score, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(player_key) DO UPDATE SET score = score + excluded.score, updated_at = excluded.updated_at "
+                "RETURNING score",
+                (player_key(player), player.strip(), int(points), datetime.utcnow().isoformat()),
+            ).fetchone()
+        return int(row[0])
+
+    def increment_many(self, deltas):
+        now = datetime.utcnow().isoformat()
+        rows = [(player_key(p), p.strip(), int(points), now) for p, points in deltas.items()]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO leaderboard (player_key, player, score, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(player_key) DO UPDATE SET score = score + excluded.score, updated_at = excluded.updated_at",
+                rows,
+            )
+
+    def get(self, player):
+        with self.lock:
+            row = self.conn.execute("SELECT score FROM leaderboard WHERE player_key = ?", (player_key(player),)).fetchone()
+        return int(row[0]) if row else 0
+
+    def top(self, limit=100):
+        with self.lock:
+            rows = self.conn.execute("SELECT player, score FROM leaderboard ORDER BY score DESC LIMIT ?", (limit,)).fetchall()
+        return [{"player": p, "score": s} for p, s in rows]
+
+class MemoryScoreStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}
+
+    def increment(self, player, points):
+        key = player_key(player)
+        with self.lock:
+            row = self.rows.setdefault(key, {"player": player.strip(), "score": 0})
+            row["score"] += int(points)
+            row["updated_at"] = datetime.utcnow().isoformat()
+            return row["score"]
+
+    def increment_many(self, deltas):
+        for player, points in deltas.items():
+            self.increment(player, points)
+
+    def get(self, player):
+        with self.lock:
+            row = self.rows.get(player_key(player))
+            return row["score"] if row else 0
+
+    def top(self, limit=100):
+        with self.lock:
+            rows = sorted(self.rows.values(), key=lambda r: r["score"], reverse=True)[:limit]
+            return [{"player": r["player"], "score": r["score"]} for r in rows]
+
+class WriteBehindBuffer:
+    def __init__(self, store, flush_ms=500, max_entries=200, max_players=5000, on_flush=None):
+        self.store = store
+        self.flush_interval = flush_ms / 1000.0
+        self.max_entries = max_entries
+        self.max_players = max_players
+        self.on_flush = on_flush
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.pending = {}
+        self.inflight = {}
+        self.entries = 0
+        self.dropped = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="score-write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def add(self, player, points):
+        key = player_key(player)
+        with self.cond:
+            full = key not in self.pending and len(self.pending) >= self.max_players
+            if not full:
+                entry = self.pending.setdefault(key, [player.strip(), 0])
+                entry[1] += int(points)
+                self.entries += 1
+                if self.entries >= self.max_entries:
+                    self.cond.notify()
+                return
+        # buffer is at its player bound: drain it on the caller's thread, then write this one directly
+        self.flush()
+        try:
+            self.store.increment(player, points)
+        except Exception:
+            with self.cond:
+                self.dropped += 1
+
+    def pending_points(self, player):
+        # in-flight points are counted until the batch lands, so a reader never sees the score dip mid-flush
+        key = player_key(player)
+        with self.cond:
+            total = 0
+            for table in (self.pending, self.inflight):
+                if key in table:
+                    total += table[key][1]
+            return total
+
+    def flush(self):
+        with self.flush_lock:
+            with self.cond:
+                if not self.pending:
+                    return 0
+                self.inflight, self.pending = self.pending, {}
+                self.entries = 0
+                batch = self.inflight
+            try:
+                self.store.increment_many({name: pts for name, pts in batch.values()})
+            except Exception:
+                with self.cond:
+                    for key, (name, pts) in batch.items():
+                        if key in self.pending or len(self.pending) < self.max_players:
+                            entry = self.pending.setdefault(key, [name, 0])
+                            entry[1] += pts
+                        else:
+                            self.dropped += 1
+                    self.inflight = {}
+                return 0
+            # readers drop their cached base before the in-flight points stop counting, or the score would dip
+            if self.on_flush:
+                try:
+                    self.on_flush([name for name, _ in batch.values()])
+                except Exception:
+                    pass
+            with self.cond:
+                self.inflight = {}
+            return len(batch)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if self.closed:
+                    return
+                self.cond.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify()
+        self.flush()
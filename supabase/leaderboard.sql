@@ -0,0 +1,69 @@
+-- Atomic score increments for the leaderboard table.
+-- Players are matched on a normalized key (trimmed, lower-cased, single spaces)
+-- so "Alice" and " alice " share one row and a correct guess is a single RPC.
+
+alter table public.leaderboard
+  add column if not exists player_key text
+  generated always as (regexp_replace(lower(btrim(player)), '\s+', ' ', 'g')) stored;
+
+-- fold rows that only differ by case/whitespace before the unique index goes on
+create temporary table leaderboard_merged as
+  select player_key,
+         (array_agg(player order by updated_at desc nulls last))[1] as player,
+         sum(score) as score,
+         max(updated_at) as updated_at
+    from public.leaderboard
+   group by player_key
+  having count(*) > 1;
+
+delete from public.leaderboard
+ where player_key in (select player_key from leaderboard_merged);
+
+insert into public.leaderboard (player, score, updated_at)
+select player, score, updated_at from leaderboard_merged;
+
+drop table leaderboard_merged;
+
+create unique index if not exists leaderboard_player_key_idx
+  on public.leaderboard (player_key);
+
+create or replace function public.increment_score(p_player text, p_points integer)
+returns integer
+language sql
+as $$
+  insert into public.leaderboard (player, score, updated_at)
+  values (btrim(p_player), p_points, now())
+  on conflict (player_key) do update
+    set score = public.leaderboard.score + excluded.score,
+        updated_at = excluded.updated_at
+  returning score;
+$$;
+
+-- bulk form used by the write-behind buffer; rows are [{"player": ..., "points": ...}]
+create or replace function public.increment_scores(p_rows jsonb)
+returns void
+language sql
+as $$
+  insert into public.leaderboard (player, score, updated_at)
+  select min(btrim(r.player)), sum(r.points)::integer, now()
+    from jsonb_to_recordset(p_rows) as r(player text, points integer)
+   group by regexp_replace(lower(btrim(r.player)), '\s+', ' ', 'g')
+  on conflict (player_key) do update
+    set score = public.leaderboard.score + excluded.score,
+        updated_at = excluded.updated_at;
+$$;
+
+create or replace function public.player_score(p_player text)
+returns integer
+language sql
+stable
+as $$
+  select coalesce(
+    (select score from public.leaderboard
+      where player_key = regexp_replace(lower(btrim(p_player)), '\s+', ' ', 'g')),
+    0);
+$$;
+
+grant execute on function public.increment_score(text, integer) to anon, authenticated;
+grant execute on function public.increment_scores(jsonb) to anon, authenticated;
+grant execute on function public.player_score(text) to anon, authenticated;
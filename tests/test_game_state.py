@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import Conversation
+from game_state import GameStore, MemoryGameBackend, SQLiteGameBackend
+
+def play(store, game_id, conv, asks):
+    record = {"p": "Asha", "c": ["Tom Hardy"], "n": [0]}
+    for i in range(asks):
+        conv.add(f"question {i}?", f"answer {i}.")
+        record["n"][0] += 1
+        record["m0"] = conv.to_dict()
+        store.save(game_id, record)
+    return record
+
+def test_turns_survive_a_reload_from_sqlite(tmp_path):
+    backend = SQLiteGameBackend(str(tmp_path / "games.db"))
+    play(GameStore(backend), "g1", Conversation(), 3)
+
+    # a fresh store has nothing cached, as after a restart or on another replica
+    record = GameStore(backend).load("g1")
+    assert record["n"] == [3]
+    assert Conversation.from_dict(record["m0"]).turns == [[f"question {i}?", f"answer {i}."] for i in range(3)]
+
+def test_turns_survive_a_reload_from_memory():
+    backend = MemoryGameBackend()
+    play(GameStore(backend), "g1", Conversation(), 3)
+
+    record, _ = backend.load("g1")
+    assert len(record["m0"]["t"]) == 3
+
+def test_loaded_records_do_not_share_lists():
+    store = GameStore(MemoryGameBackend())
+    store.save("g1", {"p": "Asha", "n": [0]})
+    first = store.load("g1")
+    first["n"][0] = 5
+    assert store.load("g1")["n"] == [0]
+
+def test_save_writes_only_changed_fields():
+    store = GameStore(MemoryGameBackend())
+    conv = Conversation()
+    record = play(store, "g1", conv, 1)
+    assert store.save("g1", record) == 0
+    conv.add("another?", "sure.")
+    record["m0"] = conv.to_dict()
+    assert store.save("g1", record) == 1
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import guess_matcher
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    guess_matcher._memo.clear()
+    yield
+    guess_matcher._memo.clear()
+
+# None means the local matcher must not decide and the guess goes to the model
+LOCAL_VERDICTS = [
+    ("Leonardo DiCaprio", "Leonardo DiCaprio", True),
+    ("leonardo dicaprio!", "Leonardo DiCaprio", True),
+    ("Leo", "Leonardo DiCaprio", True),
+    ("Leonardo DiCapria", "Leonardo DiCaprio", True),
+    ("SRK", "Shah Rukh Khan", True),
+    ("Shah Rukh", "Shah Rukh Khan", True),
+    ("Mammootty", "Mammootty", True),
+    ("", "Tom Hardy", False),
+    ("Tom Cruise", "Leonardo DiCaprio", False),
+    ("Meryl Streep", "Shah Rukh Khan", False),
+    # one word of a longer name, or one edit between single words, can point at a different celebrity
+    ("Kajol", "Kajal Aggarwal", None),
+    ("Kapoor", "Ranbir Kapoor", None),
+    ("Khan", "Shah Rukh Khan", None),
+    ("Chopra", "Priyanka Chopra", None),
+    ("Leonardo", "Leonardo DiCaprio", None),
+    # two-letter initials are as ambiguous as a single word
+    ("TH", "Tom Hardy", None),
+    ("ew", "Emma Watson", None),
+    ("Tom Hanks", "Tom Hardy", None),
+    ("Kareena Kapoor", "Karisma Kapoor", None),
+    # nicknames the alias table does not know must not be rejected locally
+    ("Big B", "Amitabh Bachchan", None),
+    ("Bebo", "Kareena Kapoor", None),
+    ("Thalaivar", "Rajinikanth", None),
+    ("The Rock", "Dwayne Johnson", None),
+    ("Lalettan", "Mohanlal", None),
+]
+
+@pytest.mark.parametrize("guess,actual,expected", LOCAL_VERDICTS)
+def test_local_verdict(guess, actual, expected):
+    assert guess_matcher.local_verdict(guess, actual) is expected
+
+def test_grey_zone_asks_the_model():
+    calls = []
+
+    def fallback(guess, actual):
+        calls.append(guess)
+        return True
+
+    assert guess_matcher.match_guess("Big B", "Amitabh Bachchan", fallback) is True
+    assert guess_matcher.match_guess("Big B", "Amitabh Bachchan", fallback) is True
+    assert calls == ["Big B"]
+
+def test_local_rejection_is_not_memoized():
+    assert guess_matcher.match_guess("Tom Cruise", "Leonardo DiCaprio", lambda g, a: True) is False
+    assert guess_matcher.memo_get("Tom Cruise", "Leonardo DiCaprio") is None
+
+# verdicts when the model gives none (breaker open or a failed call)
+DEGRADED_VERDICTS = [
+    ("Dicapiro", "Leonardo DiCaprio", False),
+    ("Shahruk Khan", "Shah Rukh Khan", True),
+    ("Tom Hanks", "Tom Hardy", False),
+    ("Emma Stone", "Emma Watson", False),
+    ("Chris Pine", "Chris Pratt", False),
+    ("Ryan Gosling", "Ryan Reynolds", False),
+    ("Kareena Kapoor", "Karisma Kapoor", False),
+    ("Kapoor", "Ranbir Kapoor", False),
+    ("Kajol", "Kajal Aggarwal", False),
+    ("Big B", "Amitabh Bachchan", False),
+]
+
+@pytest.mark.parametrize("guess,actual,expected", DEGRADED_VERDICTS)
+def test_match_without_model(guess, actual, expected):
+    assert guess_matcher.match_guess(guess, actual, lambda g, a: None) is expected
+    assert guess_matcher.memo_get(guess, actual) is None
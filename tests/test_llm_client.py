@@ -0,0 +1,183 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_client
+from llm_client import CircuitBreaker, CircuitOpenError, LLMClient, TokenBucket
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(llm_client.time, "monotonic", c)
+    return c
+
+def tripped(clock, **kwargs):
+    breaker = CircuitBreaker(window=4, min_calls=2, cooldown=10.0, **kwargs)
+    for _ in range(2):
+        assert breaker.allow() is None
+        breaker.record(False, 0.1)
+    assert breaker.state == breaker.OPEN
+    return breaker
+
+def test_breaker_trips_on_error_rate(clock):
+    breaker = tripped(clock)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.get_stats() == {"circuit_open": 1, "circuit_trips": 1, "circuit_rejected": 1}
+
+def test_breaker_trips_on_p95_latency(clock):
+    breaker = CircuitBreaker(window=4, min_calls=2, latency_p95=1.0)
+    breaker.record(True, 3.0)
+    breaker.record(True, 3.0)
+    assert breaker.state == breaker.OPEN
+
+def test_breaker_ignores_latency_of_unjudged_calls(clock):
+    breaker = CircuitBreaker(window=4, min_calls=2, latency_p95=1.0)
+    for _ in range(4):
+        breaker.record(True, None)
+    assert breaker.state == breaker.CLOSED
+
+def test_half_open_admits_one_probe(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    token = breaker.allow()
+    assert token is not None
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record(True, 0.1, token)
+    assert breaker.state == breaker.CLOSED
+    assert breaker.allow() is None
+
+def test_failed_probe_reopens(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    breaker.record(False, 0.1, breaker.allow())
+    assert breaker.state == breaker.OPEN
+    assert breaker.trips == 2
+
+def test_slow_probe_reopens(clock):
+    breaker = tripped(clock, latency_p95=1.0)
+    clock.now += 10
+    breaker.record(True, 5.0, breaker.allow())
+    assert breaker.state == breaker.OPEN
+
+@pytest.mark.parametrize("ok", [True, False])
+def test_call_admitted_before_the_trip_does_not_decide(clock, ok):
+    breaker = CircuitBreaker(window=4, min_calls=2, cooldown=10.0)
+    stale = breaker.allow()
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    clock.now += 10
+    token = breaker.allow()
+    breaker.record(ok, 0.1, stale)
+    assert breaker.state == breaker.HALF_OPEN
+    breaker.record(True, 0.1, token)
+    assert breaker.state == breaker.CLOSED
+
+def test_abandoned_probe_is_replaced_and_cannot_decide(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    abandoned = breaker.allow()
+    clock.now += 10
+    token = breaker.allow()
+    assert token != abandoned
+    breaker.record(True, 0.1, abandoned)
+    assert breaker.state == breaker.HALF_OPEN
+    breaker.record(True, 0.1, token)
+    assert breaker.state == breaker.CLOSED
+
+class ScriptedBackend:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        out = self.outcomes.pop(0)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    def complete(self, model, messages, temperature, timeout):
+        return self._next(), {"prompt_tokens": 3, "completion_tokens": 2}
+
+    def stream(self, model, messages, temperature, timeout):
+        for word in self._next().split(" "):
+            yield word
+
+    def retryable(self, exc):
+        return isinstance(exc, (TimeoutError, ConnectionError))
+
+def client(backend, **kwargs):
+    return LLMClient(backend, "model", max_retries=2, backoff=0, **kwargs)
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+def test_complete_retries_retryable_errors():
+    backend = ScriptedBackend(TimeoutError(), ConnectionError(), " hello ")
+    llm = client(backend)
+    assert llm.complete(MESSAGES) == "hello"
+    stats = llm.get_stats()
+    assert (stats["calls"], stats["retries"], stats["errors"]) == (3, 2, 0)
+    assert (stats["prompt_tokens"], stats["completion_tokens"]) == (3, 2)
+
+def test_complete_gives_up_after_max_retries():
+    backend = ScriptedBackend(TimeoutError(), TimeoutError(), TimeoutError(), "late")
+    llm = client(backend)
+    with pytest.raises(TimeoutError):
+        llm.complete(MESSAGES)
+    assert backend.calls == 3
+    assert llm.get_stats()["errors"] == 1
+
+def test_complete_does_not_retry_other_errors():
+    backend = ScriptedBackend(ValueError("bad request"), "unused")
+    with pytest.raises(ValueError):
+        client(backend).complete(MESSAGES)
+    assert backend.calls == 1
+
+def test_stream_retries_before_the_first_token():
+    backend = ScriptedBackend(TimeoutError(), "hello there")
+    assert list(client(backend).stream(MESSAGES)) == ["hello", "there"]
+
+def test_open_breaker_fails_before_calling_the_backend():
+    backend = ScriptedBackend("unused")
+    breaker = CircuitBreaker(min_calls=1)
+    breaker.record(False, 0.1)
+    llm = client(backend, breaker=breaker)
+    assert llm.degraded()
+    with pytest.raises(CircuitOpenError):
+        llm.complete(MESSAGES)
+    assert backend.calls == 0
+
+def test_token_bucket_allows_a_burst_then_waits(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.5)
+    clock.now += 1
+    assert bucket.acquire(timeout=0)
+
+def test_rate_limit_wait_is_a_timeout():
+    llm = client(ScriptedBackend("unused"), rate_per_sec=1, burst=1)
+    llm.bucket.tokens = 0
+    with pytest.raises(TimeoutError):
+        llm._admit(timeout=0.01)
+
+@pytest.mark.parametrize("exc,expected", [
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (CircuitOpenError("open"), True),
+    (ValueError("stream not supported"), False),
+])
+def test_transient_errors_are_not_worth_a_blocking_retry(exc, expected):
+    assert client(ScriptedBackend()).transient(exc) is expected
@@ -0,0 +1,166 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from score_store import MemoryScoreStore, WriteBehindBuffer
+from ttl_cache import TTLCache
+
+class FlakyStore(MemoryScoreStore):
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.batches = []
+
+    def increment_many(self, deltas):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("store unavailable")
+        self.batches.append(dict(deltas))
+        super().increment_many(deltas)
+
+@pytest.fixture
+def make_buffer():
+    buffers = []
+
+    def make(store, **kwargs):
+        # a long interval keeps the background thread out of the way; tests flush by hand
+        buf = WriteBehindBuffer(store, flush_ms=60000, **kwargs)
+        buffers.append(buf)
+        return buf
+
+    yield make
+    for buf in buffers:
+        buf.close()
+
+def test_increments_for_one_player_merge(make_buffer):
+    store = FlakyStore()
+    buf = make_buffer(store)
+    buf.add("Asha", 3)
+    buf.add(" asha ", 2)
+    buf.add("Ravi", 1)
+    assert buf.pending_points("ASHA") == 5
+    assert buf.flush() == 2
+    assert store.batches == [{"Asha": 5, "Ravi": 1}]
+    assert store.get("asha") == 5
+    assert buf.pending_points("asha") == 0
+
+def test_failed_flush_requeues_the_batch(make_buffer):
+    store = FlakyStore(failures=1)
+    buf = make_buffer(store)
+    buf.add("Asha", 3)
+    assert buf.flush() == 0
+    buf.add("Asha", 1)
+    assert buf.pending_points("Asha") == 4
+    assert buf.flush() == 1
+    assert store.get("Asha") == 4
+
+def test_read_through_cache_never_dips_during_a_flush(make_buffer):
+    store = FlakyStore()
+    cache = TTLCache(ttl=60)
+    seen = []
+
+    def read():
+        return cache.get_or_load("score:asha", lambda: store.get("Asha")) + buf.pending_points("Asha")
+
+    def on_flush(players):
+        # a reader that lands just before the cached base is dropped
+        seen.append(read())
+        cache.invalidate(*[f"score:{p.lower()}" for p in players])
+
+    buf = make_buffer(store, on_flush=on_flush)
+    store.increment("Asha", 10)
+    assert read() == 10
+    buf.add("Asha", 5)
+    buf.flush()
+    assert seen == [15]
+    assert read() == 15
+
+def test_full_buffer_writes_through(make_buffer):
+    store = FlakyStore()
+    buf = make_buffer(store, max_players=1)
+    buf.add("Asha", 1)
+    buf.add("Ravi", 2)
+    assert store.get("Asha") == 1
+    assert store.get("Ravi") == 2
+
+def test_ttl_cache_serves_hits_until_invalidated():
+    cache = TTLCache(ttl=60)
+    loads = []
+    assert cache.get_or_load("k", lambda: loads.append(1) or "a") == "a"
+    assert cache.get_or_load("k", lambda: loads.append(1) or "b") == "a"
+    cache.invalidate("k")
+    assert cache.get_or_load("k", lambda: loads.append(1) or "c") == "c"
+    assert len(loads) == 2
+
+def test_ttl_cache_collapses_concurrent_misses_into_one_load():
+    cache = TTLCache(ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    while cache.get_stats()["waits"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+    assert results == [42] * 5
+    assert len(calls) == 1
+
+def test_ttl_cache_shares_a_failed_load_with_waiters():
+    cache = TTLCache(ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("down")
+
+    errors = []
+
+    def get():
+        try:
+            cache.get_or_load("k", loader)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=get)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=get)
+    follower.start()
+    while cache.get_stats()["waits"] < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert len(errors) == 2
+    assert cache.get_or_load("k", lambda: 7) == 7
+
+def test_ttl_cache_load_racing_an_invalidation_is_not_stored():
+    cache = TTLCache(ttl=60)
+
+    def loader():
+        cache.invalidate("k")
+        return "stale"
+
+    assert cache.get_or_load("k", loader) == "stale"
+    assert cache.get_or_load("k", lambda: "fresh") == "fresh"
@@ -0,0 +1,76 @@
+import threading
+import time
+
+class TTLCache:
+    def __init__(self, ttl=5.0, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.data = {}
+        self.inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "waits": 0, "invalidations": 0}
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self.lock:
+            hit = self.data.get(key)
+            if hit is not None and hit[0] > now:
+                self.stats["hits"] += 1
+                return hit[1]
+            self.stats["misses"] += 1
+            call = self.inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self.inflight[key] = {"event": threading.Event(), "value": None, "error": None}
+            else:
+                self.stats["waits"] += 1
+        if not leader:
+            # another session is already loading this key; share its result instead of issuing a second query
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["value"]
+        try:
+            value = loader()
+            call["value"] = value
+            with self.lock:
+                self.stats["loads"] += 1
+                if self.inflight.get(key) is call:
+                    if len(self.data) >= self.maxsize:
+                        self._prune(now)
+                    self.data[key] = (time.monotonic() + self.ttl, value)
+            return value
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self.lock:
+                if self.inflight.get(key) is call:
+                    del self.inflight[key]
+            call["event"].set()
+
+    def invalidate(self, *keys):
+        with self.lock:
+            self.stats["invalidations"] += 1
+            if not keys:
+                self.data.clear()
+                self.inflight.clear()
+                return
+            for key in keys:
+                self.data.pop(key, None)
+                # a load that started before the write must not repopulate the entry
+                self.inflight.pop(key, None)
+
+    def _prune(self, now):
+        for key in [k for k, (exp, _) in self.data.items() if exp <= now]:
+            del self.data[key]
+        while len(self.data) >= self.maxsize:
+            self.data.pop(next(iter(self.data)))
+
+    def get_stats(self):
+        with self.lock:
+            out = dict(self.stats)
+            out["size"] = len(self.data)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / lookups if lookups else 0.0
+        return out